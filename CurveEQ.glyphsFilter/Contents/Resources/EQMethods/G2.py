@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from math import sqrt
+from typing import TYPE_CHECKING, Sequence
+
+from .banded import solveBanded
+
+if TYPE_CHECKING:
+    from fontParts.fontshell import RPoint
+
+"""
+Curvature continuous (G2) equalization
+
+The other methods treat each segment on its own, so the curvature usually
+jumps at a smooth point between two curves. This method works on a chain of
+consecutive curve segments and keeps all handle directions. The handle
+lengths are chosen so that the curvature at the end of one segment matches
+the curvature at the start of the next one at each smooth point, while
+staying as close as possible to the current lengths.
+
+With the handle lengths a and b along the unit vectors u and v, and the
+chord D = p3 - p0, the curvature at the ends of a cubic is
+
+k0 = 2/3 * (u x D + b * u x v) / a ** 2
+k1 = 2/3 * (a * u x v - D x v) / b ** 2
+
+The curvature differences are weighted much higher than the length changes
+in a least squares problem, which is solved by Gauss-Newton iterations. A
+curvature equation only involves the two segments at its point, so the
+normal equations are a band matrix and each iteration is linear in the
+length of the chain. In a closed chain, the last segment is connected to the
+first one, which is solved as the border of the band matrix.
+"""
+
+# Weight of the curvature differences relative to the handle length changes
+curvature_weight = 1000.0
+
+max_iterations = 20
+tolerance = 1e-9
+
+# Handles are never made shorter than this fraction of their length
+min_length_ratio = 0.05
+
+
+def cross(ax: float, ay: float, bx: float, by: float) -> float:
+    return ax * by - ay * bx
+
+
+def getChains(
+    segments: Sequence[Sequence[RPoint] | None], closed: bool
+) -> list[tuple[list[int], bool]]:
+    # Split the segments of a contour into runs of consecutive cubic curves.
+    # None marks segments that are not part of a chain, e.g. lines or
+    # unselected segments. Return (segment indices, cyclic) for each run.
+    n = len(segments)
+    if closed and n > 1 and all(s is not None for s in segments):
+        return [(list(range(n)), True)]
+
+    chains = []
+    current = []
+    # In a closed contour, start after a gap so a run across the start point
+    # is not split. A closed contour with a single curve has no gap.
+    start = 0
+    if closed:
+        start = next((i for i, s in enumerate(segments) if s is None), 0)
+    for k in range(n):
+        i = (start + k) % n
+        if segments[i] is None:
+            if current:
+                chains.append((current, False))
+            current = []
+        else:
+            current.append(i)
+    if current:
+        chains.append((current, False))
+    return [(chain, cyclic) for chain, cyclic in chains if len(chain) > 1]
+
+
+def eqG2(
+    segments: Sequence[Sequence[RPoint]],
+    smooth: Sequence[bool],
+    cyclic: bool = False,
+) -> None:
+    # Adjust the handles of a chain of cubic segments (p0, p1, p2, p3) in
+    # place. smooth[j] tells if the point between the segments j and j + 1
+    # (in a cyclic chain, the last and the first segment) should be G2.
+    m = len(segments)
+    if m < 2:
+        return
+
+    # Handle directions, chords and current lengths
+    data = []
+    lengths = []
+    for p0, p1, p2, p3 in segments:
+        a = sqrt((p1.x - p0.x) ** 2 + (p1.y - p0.y) ** 2)
+        b = sqrt((p2.x - p3.x) ** 2 + (p2.y - p3.y) ** 2)
+        if a == 0 or b == 0:
+            # The curvature is undefined at a zero handle
+            return
+
+        ux = (p1.x - p0.x) / a
+        uy = (p1.y - p0.y) / a
+        vx = (p2.x - p3.x) / b
+        vy = (p2.y - p3.y) / b
+        dx = p3.x - p0.x
+        dy = p3.y - p0.y
+        data.append(
+            (
+                cross(ux, uy, dx, dy),
+                cross(ux, uy, vx, vy),
+                cross(dx, dy, vx, vy),
+                sqrt(dx * dx + dy * dy),
+            )
+        )
+        lengths.extend((a, b))
+
+    nodes = []
+    for j in range(m if cyclic else m - 1):
+        if smooth[j]:
+            nodes.append(j)
+    if not nodes:
+        return
+
+    n = 2 * m
+    x = lengths[:]
+    for _ in range(max_iterations):
+        rows = [{} for _ in range(n)]
+        rhs = [0.0] * n
+
+        # Handle length changes, relative to the current lengths
+        for i in range(n):
+            rows[i][i] = 1 / lengths[i] ** 2
+            rhs[i] = -(x[i] - lengths[i]) / lengths[i] ** 2
+
+        # Curvature differences, scaled by the chord lengths
+        for j in range(len(nodes)):
+            j0 = nodes[j]
+            j1 = (j0 + 1) % m
+            uD0, uv0, Dv0, chord0 = data[j0]
+            uD1, uv1, Dv1, chord1 = data[j1]
+            a0, b0 = x[2 * j0], x[2 * j0 + 1]
+            a1, b1 = x[2 * j1], x[2 * j1 + 1]
+            k_end = 2 / 3 * (a0 * uv0 - Dv0) / b0**2
+            k_start = 2 / 3 * (uD1 + b1 * uv1) / a1**2
+            scale = curvature_weight * (chord0 + chord1) / 2
+            f = (k_end - k_start) * scale
+            gradient = (
+                (2 * j0, 2 / 3 * uv0 / b0**2 * scale),
+                (2 * j0 + 1, -2 * k_end / b0 * scale),
+                (2 * j1, 2 * k_start / a1 * scale),
+                (2 * j1 + 1, -2 / 3 * uv1 / a1**2 * scale),
+            )
+            for r, gr in gradient:
+                rhs[r] -= gr * f
+                for c, gc in gradient:
+                    rows[r][c] = rows[r].get(c, 0.0) + gr * gc
+
+        step = solveBanded(rows, rhs, 3, 2 if cyclic and m > 2 else 0)
+
+        # Keep the handles pointing in their directions
+        factor = 1.0
+        for i in range(n):
+            limit = lengths[i] * min_length_ratio
+            if x[i] + step[i] * factor < limit:
+                factor = (limit - x[i]) / step[i]
+        x = [xi + si * factor for xi, si in zip(x, step)]
+        if (
+            max(abs(s) / length for s, length in zip(step, lengths)) * factor
+            < tolerance
+        ):
+            break
+
+    for j, (p0, p1, p2, p3) in enumerate(segments):
+        a0 = lengths[2 * j]
+        b0 = lengths[2 * j + 1]
+        a = x[2 * j]
+        b = x[2 * j + 1]
+        p1.x = p0.x + (p1.x - p0.x) * a / a0
+        p1.y = p0.y + (p1.y - p0.y) * a / a0
+        p2.x = p3.x + (p2.x - p3.x) * b / b0
+        p2.y = p3.y + (p2.y - p3.y) * b / b0
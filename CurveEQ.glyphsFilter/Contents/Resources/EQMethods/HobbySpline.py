@@ -73,6 +73,7 @@ def eqSpline(p0, p1, p2, p3, tension=1.75) -> tuple[RPoint, RPoint]:
             return p1, p2
         else:
             delta0 = complex(p2.x, p2.y) - complex(p0.x, p0.y)
+            delta1 = complex(p3.x, p3.y) - complex(p2.x, p2.y)
     else:
         delta0 = complex(p1.x, p1.y) - complex(p0.x, p0.y)
         if p3.y == p2.y and p3.x == p2.x:
@@ -1,44 +1,46 @@
 from __future__ import annotations
 
+from math import hypot, sqrt
 from typing import TYPE_CHECKING
 
-from fontTools.misc.bezierTools import calcCubicParameters, calcCubicPoints
+from .Percentage import eqPercentage
 
 if TYPE_CHECKING:
     from fontParts.fontshell import RPoint
 
 """
-Experimental quadratic optimization
+Quadratic optimization
 
-This is supposed to find a cubic Bezier than can be expressed as a quadratic
-Bezier without loss of precision.
+A cubic Bezier can be expressed as a single quadratic Bezier without loss of
+precision if both handles are at 2/3 of the distance from their on-curve
+point to the intersection of the tangents. The intersection is the off-curve
+point of the quadratic.
+
+Segments that already are within the tolerance of a single quadratic are not
+changed, so cu2qu will need only one off-curve point for each equalized
+segment.
 """
 
+# Handle length as a fraction of the triangle sides
+quadratic_curvature = 2 / 3
+
+
+def getQuadraticError(p0: RPoint, p1: RPoint, p2: RPoint, p3: RPoint) -> float:
+    # Maximum distance between the cubic and its closest single quadratic
+    return (
+        sqrt(3)
+        / 36
+        * hypot(
+            p3.x - 3 * p2.x + 3 * p1.x - p0.x,
+            p3.y - 3 * p2.y + 3 * p1.y - p0.y,
+        )
+    )
+
 
 def eqQuadratic(
-    p0: RPoint, p1: RPoint, p2: RPoint, p3: RPoint
+    p0: RPoint, p1: RPoint, p2: RPoint, p3: RPoint, tolerance: float = 0.0
 ) -> tuple[RPoint, RPoint]:
-    # Nearest quadratic bezier (TT curve)
-    # print("In: ", p0, p1, p2, p3)
-    a, b, c, d = calcCubicParameters(
-        (p0.x, p0.y), (p1.x, p1.y), (p2.x, p2.y), (p3.x, p3.y)
-    )
-    # print("Par: %0.0f x^3 + %0.0f x^2 + %0.0f x + %0.0f" % (a[0], b[0], c[0], d[0]))
-    # print("     %0.0f y^3 + %0.0f y^2 + %0.0f y + %0.0f" % (a[1], b[1], c[1], d[1]))
-    a = (0.0, 0.0)
-    q0, q1, q2, q3 = calcCubicPoints((0.0, 0.0), b, c, d)
-    # Find a cubic for a quadratic:
-    # cp1 = (q0[0] + 2.0/3 * (q1[0] - q0[0]), q0[1] + 2.0/3 * (q1[1] - q0[1]))
-    # cp2 = (q2[0] + 2.0/3 * (q1[0] - q2[0]), q2[1] + 2.0/3 * (q1[1] - q2[1]))
-    # print("Out:", q0, q1, q2, q3)
-    scaleX = (p3.x - p0.x) / (q3[0] - q0[0])
-    scaleY = (p3.y - p0.y) / (q3[1] - q0[1])
-    # print(scaleX, scaleY)
-    p1.x = (q1[0] - q0[0]) * scaleX + q0[0]
-    p1.y = (q1[1] - q0[1]) * scaleY + q0[1]
-    p2.x = (q2[0] - q0[0]) * scaleX + q0[0]
-    p2.y = (q2[1] - q0[1]) * scaleY + q0[1]
-    p3.x = (q3[0] - q0[0]) * scaleX + q0[0]
-    p3.y = (q3[1] - q0[1]) * scaleY + q0[1]
-    # print(p0, p1, p2, p3)
-    return p1, p2
+    if getQuadraticError(p0, p1, p2, p3) <= tolerance:
+        return p1, p2
+
+    return eqPercentage(p0, p1, p2, p3, quadratic_curvature)
@@ -1,15 +1,25 @@
 from __future__ import annotations
 
+from EQMethods.Arc import eqArc
+from EQMethods.ArcLength import eqArcLength
+from EQMethods.Area import eqArea
+from EQMethods.Auto import eqAuto
 from EQMethods.Balance import eqBalance
+from EQMethods.G2 import eqG2
 from EQMethods.HobbySpline import eqSpline
 from EQMethods.Percentage import eqPercentage
 from EQMethods.Quadratic import eqQuadratic
 from EQMethods.RuleOfThirds import eqThirds
 
 __all__ = [
+    "eqArc",
+    "eqArcLength",
+    "eqArea",
+    "eqAuto",
     "eqBalance",
+    "eqG2",
     "eqPercentage",
-    # "eqQuadratic",
+    "eqQuadratic",
     "eqSpline",
     "eqThirds",
 ]
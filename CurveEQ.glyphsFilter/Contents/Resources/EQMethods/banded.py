@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from math import sqrt
+
+"""
+Linear solvers for symmetric positive definite band matrices
+
+The matrix is given as a list of rows, each row a dict of column index to
+value, with both triangles filled in. All entries must be within the
+bandwidth of the diagonal, except for the rows and columns of the first
+unknowns ("border"), which may couple to any other unknown. This is the
+shape of the equations of a closed contour, where the last segment is
+connected to the first one.
+
+The band is solved by a Cholesky decomposition, the border by its Schur
+complement, so the time is linear in the number of unknowns.
+"""
+
+Rows = list[dict[int, float]]
+
+
+def choleskyBanded(band: list[list[float]], bandwidth: int) -> list[list[float]]:
+    # band[i][k] is the entry (i, i - k) of the lower triangle. Return the
+    # lower triangular factor in the same layout.
+    n = len(band)
+    factor = [[0.0] * (bandwidth + 1) for _ in range(n)]
+    for i in range(n):
+        for j in range(max(0, i - bandwidth), i + 1):
+            s = band[i][i - j]
+            for k in range(max(0, i - bandwidth), j):
+                s -= factor[i][i - k] * factor[j][j - k]
+            if i == j:
+                if s <= 0:
+                    raise ValueError("Matrix is not positive definite")
+                factor[i][0] = sqrt(s)
+            else:
+                factor[i][i - j] = s / factor[j][0]
+    return factor
+
+
+def solveCholeskyBanded(
+    factor: list[list[float]], bandwidth: int, rhs: list[float]
+) -> list[float]:
+    n = len(factor)
+    # Forward substitution
+    y = [0.0] * n
+    for i in range(n):
+        s = rhs[i]
+        for k in range(max(0, i - bandwidth), i):
+            s -= factor[i][i - k] * y[k]
+        y[i] = s / factor[i][0]
+    # Back substitution
+    x = [0.0] * n
+    for i in range(n - 1, -1, -1):
+        s = y[i]
+        for k in range(i + 1, min(n, i + bandwidth + 1)):
+            s -= factor[k][k - i] * x[k]
+        x[i] = s / factor[i][0]
+    return x
+
+
+def solveDense(matrix: list[list[float]], rhs: list[float]) -> list[float]:
+    # Gaussian elimination with partial pivoting for the small border system
+    n = len(rhs)
+    a = [row[:] + [rhs[i]] for i, row in enumerate(matrix)]
+    for i in range(n):
+        pivot = max(range(i, n), key=lambda r: abs(a[r][i]))
+        if a[pivot][i] == 0:
+            raise ValueError("Matrix is singular")
+
+        a[i], a[pivot] = a[pivot], a[i]
+        for r in range(i + 1, n):
+            f = a[r][i] / a[i][i]
+            for c in range(i, n + 1):
+                a[r][c] -= f * a[i][c]
+    x = [0.0] * n
+    for i in range(n - 1, -1, -1):
+        s = a[i][n] - sum(a[i][c] * x[c] for c in range(i + 1, n))
+        x[i] = s / a[i][i]
+    return x
+
+
+def solveBanded(
+    rows: Rows, rhs: list[float], bandwidth: int, border: int = 0
+) -> list[float]:
+    n = len(rhs)
+    band = [[0.0] * (bandwidth + 1) for _ in range(n - border)]
+    for i in range(border, n):
+        for j, value in rows[i].items():
+            if border <= j <= i:
+                band[i - border][i - j] = value
+    factor = choleskyBanded(band, bandwidth)
+    y = solveCholeskyBanded(factor, bandwidth, rhs[border:])
+    if border == 0:
+        return y
+
+    # Solve for the border unknowns with the Schur complement
+    z = [
+        solveCholeskyBanded(
+            factor, bandwidth, [rows[i].get(b, 0.0) for i in range(border, n)]
+        )
+        for b in range(border)
+    ]
+    schur = []
+    schur_rhs = []
+    for a in range(border):
+        inner = [(j - border, value) for j, value in rows[a].items() if j >= border]
+        schur.append(
+            [
+                rows[a].get(b, 0.0) - sum(value * z[b][j] for j, value in inner)
+                for b in range(border)
+            ]
+        )
+        schur_rhs.append(rhs[a] - sum(value * y[j] for j, value in inner))
+    x_border = solveDense(schur, schur_rhs)
+    x_inner = [
+        y[i] - sum(z[b][i] * x_border[b] for b in range(border))
+        for i in range(n - border)
+    ]
+    return x_border + x_inner
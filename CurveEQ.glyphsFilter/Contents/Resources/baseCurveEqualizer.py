@@ -4,34 +4,50 @@ from vanilla import Button, EditText, FloatingWindow, Group, RadioGroup, Slider,
 
 
 class BaseCurveEqualizer:
+    methods = {
+        0: "fl",
+        1: "thirds",
+        2: "balance",
+        3: "adjust",
+        4: "free",
+        5: "hobby",
+        6: "quadratic",
+        7: "arc",
+        8: "area",
+        9: "arclength",
+        10: "auto",
+        11: "g2",
+    }
+
+    methodNames = [
+        "Circle",
+        "Thirds",
+        "Balance",
+        "Fixed:",
+        "Adjust:",
+        "Hobby:",
+        "TrueType",
+        "Arc",
+        "Area",
+        "Arc Length",
+        "Auto",
+        "G2",
+    ]
+
+    curvatures = {
+        0: 0.552,
+        1: 0.577,
+        2: 0.602,
+        3: 0.627,
+        4: 0.652,
+    }
+
     def build_ui(self, useFloatingWindow: bool = True) -> None:
-        self.methods = {
-            0: "fl",
-            1: "thirds",
-            2: "balance",
-            3: "adjust",
-            4: "free",
-            5: "hobby",
-        }
-
-        self.methodNames = [
-            "Circle",
-            "Thirds",
-            "Balance",
-            "Fixed:",
-            "Adjust:",
-            "Hobby:",
-        ]
-
-        self.curvatures = {
-            0: 0.552,
-            1: 0.577,
-            2: 0.602,
-            3: 0.627,
-            4: 0.652,
-        }
-
-        height = 180
+        # The radio buttons are distributed evenly over the height of the
+        # method selector, keep the row height constant so the sliders stay
+        # aligned with their methods
+        rowHeight = 68 / 3
+        height = 44 + round(rowHeight * len(self.methodNames))
         width = 250
         sliderX = 76
 
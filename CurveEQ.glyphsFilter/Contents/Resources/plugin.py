@@ -1,8 +1,21 @@
 import objc
 from baseCurveEqualizer import BaseCurveEqualizer
 from EQExtensionID import extensionID
-from EQMethods import eqBalance, eqPercentage, eqSpline, eqThirds
-from GlyphsApp import GSOFFCURVE, Glyphs
+from EQMethods import (
+    eqArc,
+    eqArcLength,
+    eqArea,
+    eqAuto,
+    eqBalance,
+    eqG2,
+    eqPercentage,
+    eqQuadratic,
+    eqSpline,
+    eqThirds,
+)
+from EQMethods.G2 import getChains
+from EQMethods.geometry import Point
+from GlyphsApp import GSCURVE, GSOFFCURVE, Glyphs
 from GlyphsApp.plugins import FilterWithDialog
 
 
@@ -14,8 +27,13 @@ METHOD_KEY = fullkey("method")
 ADJUST_KEY = fullkey("curvature")
 ADJUST_FREE_KEY = fullkey("curvatureFree")
 TENSION_KEY = fullkey("tension")
+QUADRATIC_TOLERANCE_KEY = fullkey("quadraticTolerance")
+AUTO_OBJECTIVE_KEY = fullkey("autoObjective")
 DECIMALS = 2
 
+# Handles that move less than this are not written back to the node
+MOVE_TOLERANCE = 0.001
+
 
 class CurveEQ(FilterWithDialog, BaseCurveEqualizer):
     @objc.python_method
@@ -165,6 +183,10 @@ class CurveEQ(FilterWithDialog, BaseCurveEqualizer):
             print("Curve Equalizer should not be used on export.")
             return
 
+        if self.method == "g2":
+            [self.g2_path(path, layer.selection) for path in layer.paths]
+            return
+
         segments = []
         for path in layer.paths:
             node_index = 0
@@ -185,19 +207,43 @@ class CurveEQ(FilterWithDialog, BaseCurveEqualizer):
                         )
 
         if self.method == "balance":
-            [self.balance_segment(s) for s in segments]
+            method = self.balance_segment
         elif self.method == "adjust":
-            [self.adjust_segment(s) for s in segments]
+            method = self.adjust_segment
         elif self.method == "free":
-            [self.adjust_free_segment(s) for s in segments]
+            method = self.adjust_free_segment
         elif self.method == "hobby":
-            [self.adjust_tension_segment(s) for s in segments]
+            method = self.adjust_tension_segment
         elif self.method == "fl":
-            [self.fl_segment(s) for s in segments]
+            method = self.fl_segment
         elif self.method == "thirds":
-            [self.thirds_segment(s) for s in segments]
+            method = self.thirds_segment
+        elif self.method == "quadratic":
+            method = self.quadratic_segment
+        elif self.method == "arc":
+            method = self.arc_segment
+        elif self.method == "area":
+            method = self.area_segment
+        elif self.method == "arclength":
+            method = self.arclength_segment
+        elif self.method == "auto":
+            method = self.auto_segment
         else:
             print(f"WARNING: Unknown equalize method: {self.method}")
+            return
+
+        for segment in segments:
+            # Calculate on copies, so nodes that do not move stay untouched
+            points = [Point(n.x, n.y) for n in segment]
+            method(points)
+            self.move_nodes(segment[1:3], points[1:3])
+
+    @objc.python_method
+    def move_nodes(self, nodes, points):
+        for node, p in zip(nodes, points):
+            if abs(node.x - p.x) > MOVE_TOLERANCE or abs(node.y - p.y) > MOVE_TOLERANCE:
+                node.x = p.x
+                node.y = p.y
 
     @objc.python_method
     def adjust_segment(self, segment):
@@ -235,6 +281,67 @@ class CurveEQ(FilterWithDialog, BaseCurveEqualizer):
         p0, p1, p2, p3 = segment
         eqThirds(p0, p1, p2, p3)
 
+    @objc.python_method
+    def quadratic_segment(self, segment):
+        # Make the segment expressible as a single quadratic
+        p0, p1, p2, p3 = segment
+        tolerance = Glyphs.defaults[QUADRATIC_TOLERANCE_KEY] or 0.0
+        eqQuadratic(p0, p1, p2, p3, tolerance)
+
+    @objc.python_method
+    def arc_segment(self, segment):
+        # Apply circular arc curvature
+        p0, p1, p2, p3 = segment
+        eqArc(p0, p1, p2, p3)
+
+    @objc.python_method
+    def area_segment(self, segment):
+        # Preserve the area enclosed by the curve
+        p0, p1, p2, p3 = segment
+        eqArea(p0, p1, p2, p3)
+
+    @objc.python_method
+    def arclength_segment(self, segment):
+        # Equal arc length for each third of the curve
+        p0, p1, p2, p3 = segment
+        eqArcLength(p0, p1, p2, p3)
+
+    @objc.python_method
+    def auto_segment(self, segment):
+        # Use the best of the candidate methods
+        p0, p1, p2, p3 = segment
+        objective = Glyphs.defaults[AUTO_OBJECTIVE_KEY]
+        if objective is not None:
+            objective = dict(objective)
+        eqAuto(p0, p1, p2, p3, objective, Glyphs.defaults[TENSION_KEY])
+
+    @objc.python_method
+    def g2_path(self, path, selection):
+        # Match the curvature at smooth points of selected curve segments
+        segments = []
+        for node_index, n in enumerate(path.nodes):
+            if n.type == GSOFFCURVE:
+                continue
+
+            if not path.closed and node_index == 0:
+                # No segment ends at the first node of an open path
+                continue
+
+            p2 = path.nodeAtIndex_(node_index - 1)
+            if n.type == GSCURVE and p2 in selection:
+                p1 = path.nodeAtIndex_(node_index - 2)
+                p0 = path.nodeAtIndex_(node_index - 3)
+                if p1.type == GSOFFCURVE and p0.type != GSOFFCURVE:
+                    segments.append((p0, p1, p2, n))
+                    continue
+
+            segments.append(None)
+        for chain, cyclic in getChains(segments, path.closed):
+            points = [[Point(n.x, n.y) for n in segments[i]] for i in chain]
+            eqG2(points, [segments[i][3].smooth for i in chain], cyclic)
+            for i, p in zip(chain, points):
+                self.move_nodes(segments[i][1:3], p[1:3])
+
     @objc.python_method
     def __file__(self):
         """Please leave this method unchanged"""
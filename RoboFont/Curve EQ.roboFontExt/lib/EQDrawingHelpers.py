@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from math import cos, sin
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Sequence
 
 if TYPE_CHECKING:
     from fontParts.fontshell import RPoint
@@ -31,6 +31,24 @@ def appendCurveSegment(
     layer.setStrokeWidth(width)
 
 
+def appendQCurveSegment(
+    curveLayer: MerzCALayer,
+    p0: RPoint,
+    points: Sequence[RPoint],
+    color: tuple[float, float, float, float] = (0, 0, 0, 1),
+    width: float = 1,
+) -> None:
+    # points are the off-curve points and the final on-curve point
+    layer = curveLayer.appendPathSublayer()
+    pen = layer.getPen()
+    pen.moveTo((p0.x, p0.y))
+    pen.qCurveTo(*[(p.x, p.y) for p in points])
+    pen.endPath()
+    layer.setFillColor(None)
+    layer.setStrokeColor(color)
+    layer.setStrokeWidth(width)
+
+
 def appendHandle(
     container: Container,
     pt: RPoint,
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from math import pi, tan
+from typing import TYPE_CHECKING, Tuple
+
+from .geometry import getTriangleAngles
+from .Percentage import eqPercentage
+
+if TYPE_CHECKING:
+    from fontParts.fontshell import RPoint
+
+"""
+Circular arc
+
+The handle length of a cubic Bezier that approximates a circular arc of the
+angle theta is r * 4/3 * tan(theta / 4). Relative to the tangent length
+r * tan(theta / 2), this is 2/3 * (1 - tan(theta / 4) ** 2), which gives the
+well known 0.552 for a quarter circle. The ratio is applied to the triangle
+sides like in eqPercentage.
+"""
+
+
+def normalizeAngle(angle: float) -> float:
+    # Return the angle in the range -pi to pi
+    return (angle + pi) % (2 * pi) - pi
+
+
+def getArcCurvature(p0: RPoint, p1: RPoint, p2: RPoint, p3: RPoint) -> float:
+    alpha, _, gamma = getTriangleAngles(p0, p1, p2, p3)
+
+    # The angle the curve turns between p0 and p3
+    theta = abs(normalizeAngle(alpha) + normalizeAngle(gamma))
+    return 2 / 3 * (1 - tan(theta / 4) ** 2)
+
+
+def eqArc(p0: RPoint, p1: RPoint, p2: RPoint, p3: RPoint) -> Tuple[RPoint, RPoint]:
+    return eqPercentage(p0, p1, p2, p3, getArcCurvature(p0, p1, p2, p3))
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Tuple
+
+from .geometry import Point, distance, getArcLength, getNewCoordinates
+
+if TYPE_CHECKING:
+    from fontParts.fontshell import RPoint
+
+"""
+Equal arc length
+
+Rule of Thirds makes the three legs of the control polygon the same length,
+which is a rough approximation of a curve that is traversed at constant
+speed. This method keeps the handle directions and solves for the two handle
+lengths that give each third of the parameter range (0-1/3, 1/3-2/3, 2/3-1)
+the same arc length.
+
+The arc lengths are calculated by Gauss-Legendre quadrature, the lengths are
+found by Newton's method starting from the Rule of Thirds solution. If no
+solution with positive handle lengths is found, the Rule of Thirds solution
+is used.
+"""
+
+max_iterations = 12
+tolerance = 1e-6
+
+
+def getThirdsLengths(
+    p0: RPoint,
+    p3: RPoint,
+    u: Tuple[float, float],
+    v: Tuple[float, float],
+    l1: float,
+    l2: float,
+) -> Tuple[float, float, float]:
+    # Arc lengths of the three thirds of the curve with the handle lengths
+    # l1 and l2 along the unit vectors u and v
+    p1 = Point(p0.x + u[0] * l1, p0.y + u[1] * l1)
+    p2 = Point(p3.x + v[0] * l2, p3.y + v[1] * l2)
+    return (
+        getArcLength(p0, p1, p2, p3, 0, 1 / 3),
+        getArcLength(p0, p1, p2, p3, 1 / 3, 2 / 3),
+        getArcLength(p0, p1, p2, p3, 2 / 3, 1),
+    )
+
+
+def getResiduals(
+    p0: RPoint,
+    p3: RPoint,
+    u: Tuple[float, float],
+    v: Tuple[float, float],
+    l1: float,
+    l2: float,
+) -> Tuple[float, float]:
+    s1, s2, s3 = getThirdsLengths(p0, p3, u, v, l1, l2)
+    return s1 - s2, s3 - s2
+
+
+def eqArcLength(
+    p0: RPoint, p1: RPoint, p2: RPoint, p3: RPoint
+) -> Tuple[RPoint, RPoint]:
+    if p1.x == p0.x and p1.y == p0.y and p2.x == p3.x and p2.y == p3.y:
+        # Both zero handles
+        return p1, p2
+
+    # Rule of Thirds as the starting point
+    d = (distance(p0, p1) + distance(p1, p2) + distance(p2, p3)) / 3
+
+    # Unit vectors of the handle directions
+    x, y = getNewCoordinates(p1, p0, p2, 1)
+    u = (x - p0.x, y - p0.y)
+    x, y = getNewCoordinates(p2, p3, p1, 1)
+    v = (x - p3.x, y - p3.y)
+
+    l1 = l2 = d
+    h = d * 1e-6
+    for _ in range(max_iterations):
+        f1, f2 = getResiduals(p0, p3, u, v, l1, l2)
+        if abs(f1) + abs(f2) < tolerance * d:
+            break
+
+        # Jacobian by finite differences
+        g1, g2 = getResiduals(p0, p3, u, v, l1 + h, l2)
+        k1, k2 = getResiduals(p0, p3, u, v, l1, l2 + h)
+        j11 = (g1 - f1) / h
+        j21 = (g2 - f2) / h
+        j12 = (k1 - f1) / h
+        j22 = (k2 - f2) / h
+        det = j11 * j22 - j12 * j21
+        if det == 0:
+            l1 = l2 = d
+            break
+
+        l1 -= (f1 * j22 - f2 * j12) / det
+        l2 -= (f2 * j11 - f1 * j21) / det
+        if l1 <= 0 or l2 <= 0:
+            l1 = l2 = d
+            break
+    else:
+        l1 = l2 = d
+
+    p1.x = p0.x + u[0] * l1
+    p1.y = p0.y + u[1] * l1
+
+    p2.x = p3.x + v[0] * l2
+    p2.y = p3.y + v[1] * l2
+
+    return p1, p2
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from math import atan2
+from typing import TYPE_CHECKING, Tuple
+
+from .geometry import (
+    Point,
+    distance,
+    getCurveArea,
+    getNewCoordinates,
+    getTriangleSides,
+    isOnLeft,
+    isOnRight,
+)
+
+if TYPE_CHECKING:
+    from fontParts.fontshell import RPoint
+
+"""
+Area-preserving balance
+
+Like eqBalance, both handles get the same length as a percentage of their
+triangle sides. The percentage is chosen so that the area enclosed by the
+curve and the line p0-p3 stays the same.
+
+The area is a quadratic polynomial of the percentage. Newton's method is
+started from the percentage that eqBalance would use, so it converges to the
+solution closest to it within a few iterations.
+"""
+
+max_iterations = 8
+tolerance = 1e-9
+
+
+def eqArea(p0: RPoint, p1: RPoint, p2: RPoint, p3: RPoint) -> Tuple[RPoint, RPoint]:
+    # Check for zero handles
+    zero = False
+    if p1.y == p0.y and p1.x == p0.x:
+        zero = True
+        if p3.y == p2.y and p3.x == p2.x:
+            # Both zero handles
+            return p1, p2
+    else:
+        if p3.y == p2.y and p3.x == p2.x:
+            zero = True
+
+    alpha = atan2(p1.y - p0.y, p1.x - p0.x)
+    beta = atan2(p2.y - p3.y, p2.x - p3.x)
+
+    if abs(alpha - beta) >= 0.7853981633974483:  # 45°
+        # check if both handles are on the same side of the curve
+        if (
+            zero
+            or isOnLeft(p0, p3, p1)
+            and isOnLeft(p0, p3, p2)
+            or isOnRight(p0, p3, p1)
+            and isOnRight(p0, p3, p2)
+        ):
+            a, b, c = getTriangleSides(p0, p1, p2, p3)
+            area = getCurveArea(p0, p1, p2, p3)
+
+            # Handle positions for a percentage of 1, relative to p0 and p3
+            x1, y1 = getNewCoordinates(p1, p0, p2, c)
+            x2, y2 = getNewCoordinates(p2, p3, p1, a)
+            u = (x1 - p0.x, y1 - p0.y)
+            v = (x2 - p3.x, y2 - p3.y)
+
+            def getArea(s: float) -> float:
+                q1 = Point(p0.x + u[0] * s, p0.y + u[1] * s)
+                q2 = Point(p3.x + v[0] * s, p3.y + v[1] * s)
+                return getCurveArea(p0, q1, q2, p3)
+
+            # Coefficients of the area polynomial k2 * s ** 2 + k1 * s + k0
+            k0 = getArea(0)
+            a1 = getArea(1)
+            a_1 = getArea(-1)
+            k2 = (a1 + a_1) / 2 - k0
+            k1 = (a1 - a_1) / 2
+
+            # Start with the percentage from eqBalance
+            s = (distance(p3, p2) / a + distance(p0, p1) / c) / 2
+            for _ in range(max_iterations):
+                derivative = 2 * k2 * s + k1
+                if derivative == 0:
+                    break
+
+                step = (k2 * s * s + k1 * s + k0 - area) / derivative
+                s -= step
+                if abs(step) < tolerance:
+                    break
+
+            if s <= 0:
+                # No solution with handles pointing in the original direction
+                return p1, p2
+
+            p1.x = p0.x + u[0] * s
+            p1.y = p0.y + u[1] * s
+
+            p2.x = p3.x + v[0] * s
+            p2.y = p3.y + v[1] * s
+
+    return p1, p2
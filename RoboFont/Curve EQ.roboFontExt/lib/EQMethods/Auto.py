@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from math import isfinite
+from typing import TYPE_CHECKING, Callable, Dict, Tuple
+
+from .Balance import eqBalance
+from .geometry import Point, distance, getCurveArea, getTriangleSides
+from .HobbySpline import eqSpline
+from .Percentage import eqPercentage
+from .RuleOfThirds import eqThirds
+
+if TYPE_CHECKING:
+    from fontParts.fontshell import RPoint
+
+"""
+Automatic method selection
+
+All candidate methods are applied to a copy of the segment, each result is
+scored against an objective and the result with the lowest score is used.
+
+The objective is a dict of weights for these measures, all of them are
+independent of the size of the segment:
+
+smoothness: total variation of the curvature along the curve
+area: deviation from the area enclosed by the original curve and its chord
+symmetry: difference of the two handle percentages of the triangle sides
+
+A single measure can also be given by its name.
+"""
+
+# The keys are the same as in BaseCurveEqualizer.methods
+candidates: Dict[str, Callable] = {
+    "fl": eqPercentage,
+    "balance": eqBalance,
+    "thirds": eqThirds,
+    "hobby": eqSpline,
+}
+
+default_objective = {"smoothness": 1.0, "area": 1.0, "symmetry": 1.0}
+
+# Number of intervals at which the curvature is sampled
+curvature_samples = 16
+
+
+def getCurvatureVariation(p0: RPoint, p1: RPoint, p2: RPoint, p3: RPoint) -> float:
+    # Sum of the curvature changes between the samples, multiplied by the
+    # chord length
+    ax = 3 * (p3.x - 3 * p2.x + 3 * p1.x - p0.x)
+    ay = 3 * (p3.y - 3 * p2.y + 3 * p1.y - p0.y)
+    bx = 6 * (p2.x - 2 * p1.x + p0.x)
+    by = 6 * (p2.y - 2 * p1.y + p0.y)
+    cx = 3 * (p1.x - p0.x)
+    cy = 3 * (p1.y - p0.y)
+    variation = 0
+    previous = None
+    for i in range(curvature_samples + 1):
+        t = i / curvature_samples
+        dx = (ax * t + bx) * t + cx
+        dy = (ay * t + by) * t + cy
+        ddx = 2 * ax * t + bx
+        ddy = 2 * ay * t + by
+        speed = (dx * dx + dy * dy) ** 1.5
+        if speed == 0:
+            # Zero handle, the curvature is undefined at the end point
+            continue
+
+        k = (dx * ddy - dy * ddx) / speed
+        if previous is not None:
+            variation += abs(k - previous)
+        previous = k
+    return variation * distance(p0, p3)
+
+
+def getHandleAsymmetry(p0: RPoint, p1: RPoint, p2: RPoint, p3: RPoint) -> float:
+    try:
+        a, b, c = getTriangleSides(p0, p1, p2, p3)
+    except ZeroDivisionError:
+        a = c = 0
+    if a > 0 and c > 0 and isfinite(a) and isfinite(c):
+        return abs(distance(p0, p1) / c - distance(p3, p2) / a)
+
+    # Parallel handles, compare the handle lengths
+    return abs(distance(p0, p1) - distance(p3, p2)) / distance(p0, p3)
+
+
+def getScore(
+    p0: RPoint,
+    p1: RPoint,
+    p2: RPoint,
+    p3: RPoint,
+    area: float,
+    objective: Dict[str, float],
+) -> float:
+    score = 0
+    if objective.get("smoothness"):
+        score += objective["smoothness"] * getCurvatureVariation(p0, p1, p2, p3)
+    if objective.get("area"):
+        deviation = abs(getCurveArea(p0, p1, p2, p3) - area) / distance(p0, p3) ** 2
+        score += objective["area"] * deviation
+    if objective.get("symmetry"):
+        score += objective["symmetry"] * getHandleAsymmetry(p0, p1, p2, p3)
+    return score
+
+
+def chooseMethod(
+    p0: RPoint,
+    p1: RPoint,
+    p2: RPoint,
+    p3: RPoint,
+    objective: Dict[str, float] | str | None = None,
+    tension: float = 1.75,
+) -> Tuple[str, Tuple[float, float, float, float]]:
+    # Return the key of the winning method and its handle coordinates
+    # (x1, y1, x2, y2). The points are not changed.
+    if objective is None:
+        objective = default_objective
+    elif isinstance(objective, str):
+        objective = {objective: 1.0}
+
+    if p0.x == p3.x and p0.y == p3.y:
+        return "fl", (p1.x, p1.y, p2.x, p2.y)
+
+    area = getCurveArea(p0, p1, p2, p3)
+    winner = None
+    for key, func in candidates.items():
+        q1 = Point(p1.x, p1.y)
+        q2 = Point(p2.x, p2.y)
+        if func is eqSpline:
+            q1, q2 = func(p0, q1, q2, p3, tension)
+        else:
+            q1, q2 = func(p0, q1, q2, p3)
+        score = getScore(p0, q1, q2, p3, area, objective)
+        if winner is None or score < winner[0]:
+            winner = score, key, (q1.x, q1.y, q2.x, q2.y)
+    return winner[1], winner[2]
+
+
+def eqAuto(
+    p0: RPoint,
+    p1: RPoint,
+    p2: RPoint,
+    p3: RPoint,
+    objective: Dict[str, float] | str | None = None,
+    tension: float = 1.75,
+) -> Tuple[RPoint, RPoint]:
+    _, (p1.x, p1.y, p2.x, p2.y) = chooseMethod(p0, p1, p2, p3, objective, tension)
+    return p1, p2
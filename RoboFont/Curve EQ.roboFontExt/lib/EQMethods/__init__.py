@@ -1,16 +1,25 @@
 from __future__ import annotations
 
+from .Arc import eqArc
+from .ArcLength import eqArcLength
+from .Area import eqArea
+from .Auto import eqAuto
 from .Balance import eqBalance
+from .G2 import eqG2
 from .HobbySpline import eqSpline
 from .Percentage import eqPercentage
-
-# from .Quadratic import eqQuadratic
+from .Quadratic import eqQuadratic
 from .RuleOfThirds import eqThirds
 
 __all__ = [
+    "eqArc",
+    "eqArcLength",
+    "eqArea",
+    "eqAuto",
     "eqBalance",
+    "eqG2",
     "eqPercentage",
-    # "eqQuadratic",
+    "eqQuadratic",
     "eqSpline",
     "eqThirds",
 ]
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List
+
+from .batch import Handles, Segment, equalizeSegments, getMethodFunction
+from .headless import getCurveSegments, movePoint
+
+if TYPE_CHECKING:
+    from fontParts.fontshell import RFont
+
+"""
+Equalize a font from an asyncio event loop
+
+The segments of a chunk of glyphs are copied as coordinates on the event
+loop and equalized in an executor, a process pool unless one is passed in.
+At most maxInFlight chunks are submitted at a time, the next chunk is only
+copied when the results of the oldest one are being applied. So a slow
+consumer of the progress events holds back the work instead of piling up
+results.
+
+The results are applied in the glyph order, each glyph in one go on the
+event loop. When the consumer stops iterating or the task is cancelled,
+the glyphs that are still in the executor are dropped, and every glyph is
+either completely equalized or untouched.
+"""
+
+# Default number of jobs submitted to the executor at the same time, and of
+# glyphs per job
+max_in_flight = 8
+chunk_size = 16
+
+
+def _equalizeChunk(
+    segmentLists: List[List[Segment]], method: str, params: Dict[str, Any]
+) -> List[List[Handles]]:
+    return [equalizeSegments(segments, method, **params) for segments in segmentLists]
+
+
+async def equalizeFontAsync(
+    font: RFont,
+    method: str = "balance",
+    glyphNames: List[str] | None = None,
+    selectedOnly: bool = False,
+    executor: Executor | None = None,
+    maxInFlight: int = max_in_flight,
+    chunkSize: int = chunk_size,
+    **params,
+) -> AsyncIterator[Dict[str, Any]]:
+    # Yield a progress event for each glyph:
+    # {"glyph": name, "changed": bool, "done": int, "total": int}
+    getMethodFunction(method)
+    if maxInFlight < 1 or chunkSize < 1:
+        raise ValueError("maxInFlight and chunkSize must be at least 1")
+
+    if glyphNames is None:
+        glyphNames = font.glyphOrder
+    glyphNames = [name for name in glyphNames if name in font]
+
+    loop = asyncio.get_running_loop()
+    ownExecutor = executor is None
+    if ownExecutor:
+        executor = ProcessPoolExecutor()
+
+    total = len(glyphNames)
+    inFlight = deque()
+    submitted = 0
+    done = 0
+
+    async def submit() -> None:
+        # Copy the segments of the next chunk of glyphs and submit them
+        nonlocal submitted
+        if submitted >= total:
+            return
+
+        chunk = []
+        for name in glyphNames[submitted : submitted + chunkSize]:
+            chunk.append((name, getCurveSegments(font[name], selectedOnly)))
+            # Loading the glyphs may take a while, let other tasks run
+            await asyncio.sleep(0)
+        submitted += len(chunk)
+        future = loop.run_in_executor(
+            executor,
+            _equalizeChunk,
+            [[s for _, _, s in snapshot] for _, snapshot in chunk],
+            method,
+            params,
+        )
+        inFlight.append((chunk, future))
+
+    try:
+        for _ in range(maxInFlight):
+            await submit()
+        while inFlight:
+            chunk, future = inFlight[0]
+            chunkResults = await future
+            inFlight.popleft()
+            await submit()
+            for (name, snapshot), results in zip(chunk, chunkResults):
+                glyphSegments = [contour.segments for contour in font[name]]
+                changed = False
+                for (contourIndex, i, _), (x1, y1, x2, y2) in zip(snapshot, results):
+                    p1, p2, _ = glyphSegments[contourIndex][i].points
+                    moved1 = movePoint(p1, x1, y1)
+                    moved2 = movePoint(p2, x2, y2)
+                    changed = changed or moved1 or moved2
+                done += 1
+                # Let other tasks run between the glyphs
+                await asyncio.sleep(0)
+                yield {"glyph": name, "changed": changed, "done": done, "total": total}
+    finally:
+        for _, future in inFlight:
+            future.cancel()
+        if ownExecutor:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Tuple
+
+from .Arc import eqArc
+from .ArcLength import eqArcLength
+from .Area import eqArea
+from .Auto import eqAuto
+from .Balance import eqBalance
+from .geometry import Point
+from .HobbySpline import eqSpline
+from .Percentage import eqPercentage
+from .Quadratic import eqQuadratic
+from .RuleOfThirds import eqThirds
+
+"""
+Equalize segments given as plain coordinates
+
+A segment is a tuple of the four points (x, y) of a cubic Bezier, the result
+is a tuple of the new handle coordinates (x1, y1, x2, y2). The points of the
+glyph are not touched, so this can run outside of the main thread.
+"""
+
+Coordinates = Tuple[float, float]
+Segment = Tuple[Coordinates, Coordinates, Coordinates, Coordinates]
+Handles = Tuple[float, float, float, float]
+
+# The method names are the same as in BaseCurveEqualizer.methods
+methodFunctions: Dict[str, Callable] = {
+    "fl": eqPercentage,
+    "thirds": eqThirds,
+    "balance": eqBalance,
+    "adjust": eqPercentage,
+    "free": eqPercentage,
+    "hobby": eqSpline,
+    "quadratic": eqQuadratic,
+    "arc": eqArc,
+    "area": eqArea,
+    "arclength": eqArcLength,
+    "auto": eqAuto,
+}
+
+
+def getMethodFunction(method: str) -> Callable:
+    func = methodFunctions.get(method)
+    if func is None:
+        raise ValueError(f"Unknown equalize method: {method}")
+    return func
+
+
+def equalizeSegment(segment: Segment, method: str, **params) -> Handles:
+    p0, p1, p2, p3 = [Point(x, y) for x, y in segment]
+    p1, p2 = getMethodFunction(method)(p0, p1, p2, p3, **params)
+    return p1.x, p1.y, p2.x, p2.y
+
+
+def equalizeSegments(segments: List[Segment], method: str, **params) -> List[Handles]:
+    return [equalizeSegment(segment, method, **params) for segment in segments]
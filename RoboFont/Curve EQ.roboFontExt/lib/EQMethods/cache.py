@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import json
+import os
+import plistlib
+import tempfile
+from hashlib import sha1
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from fontParts.fontshell import RGlyph
+
+"""
+Persistent result cache for the headless equalizer
+
+The results are stored as JSON files in a local directory. The file name is
+a hash of the glyph's outline data plus the method, its parameters and, if
+only the selected segments are equalized, the selection. So an unchanged
+glyph is found again on the next run. When the directory grows larger than
+the maximum size, the least recently used results are removed.
+
+The version of the extension and cache_version are part of the hash, so
+results of older method code are not used. Bump cache_version when the
+output of a method changes.
+"""
+
+# Version of the cached results
+cache_version = 1
+
+
+def getExtensionVersion() -> str | None:
+    # Version from the info.plist of the extension, if this runs from there
+    try:
+        with open(Path(__file__).parents[2] / "info.plist", "rb") as f:
+            return plistlib.load(f).get("version")
+    except (OSError, ValueError):
+        return None
+
+
+class ResultCache:
+    def __init__(self, path: str | Path, maxSize: int = 256 * 1024 * 1024) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.maxSize = maxSize
+        self.size = sum(size for _, size, _ in self.getFiles())
+        self.hits = 0
+        self.misses = 0
+        self.version = [cache_version, getExtensionVersion()]
+
+    def getKey(
+        self,
+        glyph: RGlyph,
+        method: str,
+        params: Dict[str, Any],
+        selectedOnly: bool = False,
+    ) -> str:
+        outline = [
+            [(p.type, p.smooth, p.x, p.y) for p in contour.points] for contour in glyph
+        ]
+        selection = None
+        if selectedOnly:
+            # The result depends on which segments are selected
+            selection = [
+                [segment.selected for segment in contour.segments] for contour in glyph
+            ]
+        data = json.dumps(
+            [self.version, outline, method, sorted(params.items()), selection]
+        )
+        return sha1(data.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Any:
+        path = self.path / f"{key}.json"
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        try:
+            # Mark as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another process after reading
+            pass
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        path = self.path / f"{key}.json"
+        # Parallel runs may share the cache, each writes its own temp file
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with open(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            size = os.path.getsize(tmp_path)
+            try:
+                self.size -= path.stat().st_size
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        self.size += size
+        if self.size > self.maxSize:
+            self.evict()
+
+    def getFiles(self) -> List[Tuple[float, int, Path]]:
+        # Return (modification time, size, path) of the results. Files that
+        # another process removes in the meantime are skipped.
+        files = []
+        for f in self.path.glob("*.json"):
+            try:
+                stat = f.stat()
+            except FileNotFoundError:
+                continue
+
+            files.append((stat.st_mtime, stat.st_size, f))
+        return files
+
+    def evict(self) -> None:
+        # Remove the least recently used results until the cache is smaller
+        # than 3/4 of its maximum size
+        files = sorted(self.getFiles(), key=lambda item: item[0])
+        self.size = sum(size for _, size, _ in files)
+        for _, size, f in files:
+            if self.size <= self.maxSize * 0.75:
+                break
+
+            try:
+                f.unlink()
+            except FileNotFoundError:
+                pass
+            self.size -= size
+
+    @property
+    def hitRate(self) -> float:
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+
+        return self.hits / lookups
+
+    def report(self) -> str:
+        return (
+            f"Cache: {self.hits} hits, {self.misses} misses "
+            f"({self.hitRate * 100:0.1f} % hit rate), "
+            f"{self.size / 1024 / 1024:0.1f} MB in {self.path}"
+        )
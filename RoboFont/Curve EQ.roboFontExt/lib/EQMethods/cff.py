@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import argparse
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple, Union
+
+from fontTools.cffLib.specializer import (
+    commandsToProgram,
+    generalizeCommands,
+    programToCommands,
+    specializeCommands,
+)
+from fontTools.misc.roundTools import otRound
+from fontTools.varLib.models import supportScalar
+
+from .batch import getMethodFunction
+from .designspace import getHandleOrientation
+from .geometry import Point
+
+if TYPE_CHECKING:
+    from fontTools.misc.psCharStrings import T2CharString
+    from fontTools.ttLib import TTFont
+
+"""
+Equalize the charstrings of a compiled CFF or CFF2 font
+
+Each charstring is converted to generalized commands, the curve operands are
+equalized and the commands are specialized and encoded again. Hints, hint
+masks and the advance width stay where they are, the font is never converted
+to a UFO.
+
+In variable CFF2 glyphs, each curve is equalized in the default master and
+at the peak of each region of the glyph's variation data, and the deltas
+are derived again from the new handles. The on-curve points keep their
+positions in all masters. A curve whose new handles don't point to the same
+side in all masters is left alone, like in designspace.py. Charstrings with
+flex operators are left alone.
+"""
+
+# A plain operand, or a blended one: the default value, the deltas and 1
+Operand = Union[float, List[float]]
+
+
+def getRegionScalars(charString: T2CharString, vsindex: int) -> List[List[float]]:
+    # Scalars of the region deltas at the peak of each region of the item
+    # variation data, one row per region
+    varStore = charString.private.vstore.otVarStore
+    regions = varStore.VarRegionList.Region
+    supports = [
+        {
+            axis: (r.StartCoord, r.PeakCoord, r.EndCoord)
+            for axis, r in enumerate(regions[i].VarRegionAxis)
+        }
+        for i in varStore.VarData[vsindex].VarRegionIndex
+    ]
+    peaks = [
+        {axis: peak for axis, (_, peak, _) in support.items()} for support in supports
+    ]
+    return [[supportScalar(peak, support) for support in supports] for peak in peaks]
+
+
+def _deltas(arg: Operand, regions: int) -> List[float]:
+    if isinstance(arg, list):
+        return arg[1:-1]
+
+    return [0] * regions
+
+
+def _masterValues(arg: Operand, scalars: List[List[float]]) -> List[float]:
+    # Value of the operand in the default master and at each region peak
+    if not isinstance(arg, list):
+        return [arg] * (len(scalars) + 1)
+
+    default = arg[0]
+    deltas = arg[1:-1]
+    return [default] + [
+        default + sum(c * d for c, d in zip(row, deltas)) for row in scalars
+    ]
+
+
+def _blend(default: float, deltas: List[float]) -> Operand:
+    if any(deltas):
+        return [default, *deltas, 1]
+
+    return default
+
+
+def _solve(matrix: List[List[float]], values: List[float]) -> List[float] | None:
+    # Solve matrix * x = values by Gaussian elimination, None if singular
+    n = len(values)
+    rows = [list(row) + [value] for row, value in zip(matrix, values)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        if abs(rows[pivot][col]) < 1e-9:
+            return None
+
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(n):
+            if r != col and rows[r][col]:
+                factor = rows[r][col] / rows[col][col]
+                rows[r] = [a - factor * b for a, b in zip(rows[r], rows[col])]
+    return [rows[i][n] / rows[i][i] for i in range(n)]
+
+
+def _equalizeCurve(
+    func: Callable,
+    args: List[Operand],
+    x0: List[float],
+    y0: List[float],
+    scalars: List[List[float]],
+    params: Dict,
+) -> List[Operand]:
+    # Return the new operands dx1, dy1, dx2, dy2, dx3, dy3 of one curve that
+    # starts at (x0[m], y0[m]) in master m
+    values = [_masterValues(arg, scalars) for arg in args]
+    handles = []
+    orientations = set()
+    for m in range(len(scalars) + 1):
+        dx1, dy1, dx2, dy2, dx3, dy3 = (v[m] for v in values)
+        p0 = Point(x0[m], y0[m])
+        p1 = Point(p0.x + dx1, p0.y + dy1)
+        p2 = Point(p1.x + dx2, p1.y + dy2)
+        p3 = Point(p2.x + dx3, p2.y + dy3)
+        segment = ((p0.x, p0.y), (p1.x, p1.y), (p2.x, p2.y), (p3.x, p3.y))
+        p1, p2 = func(p0, p1, p2, p3, **params)
+        if m == 0:
+            # The default master is written as integers
+            h = (otRound(p1.x), otRound(p1.y), otRound(p2.x), otRound(p2.y))
+        else:
+            h = (p1.x, p1.y, p2.x, p2.y)
+        orientations.add(getHandleOrientation(segment, h))
+        handles.append((h[0] - x0[m], h[1] - y0[m], h[2] - h[0], h[3] - h[1]))
+    if len(orientations) > 1:
+        return args
+
+    # Deltas of dx1, dy1, dx2 and dy2 that reproduce the handles at the
+    # region peaks
+    regions = len(scalars)
+    defaults = list(handles[0])
+    deltas = []
+    for k in range(4):
+        solved = _solve(scalars, [h[k] - defaults[k] for h in handles[1:]])
+        if solved is None:
+            return args
+
+        deltas.append([otRound(d) for d in solved])
+
+    # dx3 and dy3 take up the rest, so the on-curve point doesn't move in any
+    # master
+    for k in (0, 1):
+        defaults.append(
+            sum(values[j][0] for j in (k, k + 2, k + 4)) - defaults[k] - defaults[k + 2]
+        )
+        original = [
+            sum(d) for d in zip(*(_deltas(args[j], regions) for j in (k, k + 2, k + 4)))
+        ]
+        deltas.append(
+            [o - a - b for o, a, b in zip(original, deltas[k], deltas[k + 2])]
+        )
+    return [_blend(default, d) for default, d in zip(defaults, deltas)]
+
+
+def equalizeCharString(
+    charString: T2CharString, method: str = "balance", CFF2: bool = False, **params
+) -> bool:
+    # Equalize the curves of a single charstring in place, return True if
+    # the charstring has changed
+    func = getMethodFunction(method)
+    charString.decompile()
+    getNumRegions = charString.private.getNumRegions if CFF2 else None
+    commands = programToCommands(charString.program, getNumRegions=getNumRegions)
+    scalars = []
+    if any(isinstance(arg, list) for _, args in commands for arg in args):
+        vsindex = getattr(charString.private, "vsindex", 0)
+        for op, args in commands:
+            if op == "vsindex":
+                vsindex = args[0]
+        scalars = getRegionScalars(charString, vsindex)
+    commands = generalizeCommands(commands)
+
+    # Current point in each master
+    x = [0] * (len(scalars) + 1)
+    y = [0] * (len(scalars) + 1)
+    changed = False
+    for i, (op, args) in enumerate(commands):
+        if op == "rmoveto" or op == "rlineto" or op == "rrcurveto":
+            if op == "rrcurveto":
+                new_args = []
+                for j in range(0, len(args), 6):
+                    new_args.extend(
+                        _equalizeCurve(func, args[j : j + 6], x, y, scalars, params)
+                    )
+                if any(
+                    _masterValues(a, scalars) != _masterValues(b, scalars)
+                    for a, b in zip(new_args, args)
+                ):
+                    commands[i] = (op, new_args)
+                    changed = True
+            for j in range(0, len(args), 2):
+                for m, value in enumerate(_masterValues(args[j], scalars)):
+                    x[m] += value
+                for m, value in enumerate(_masterValues(args[j + 1], scalars)):
+                    y[m] += value
+        elif op.endswith("flex"):
+            return False
+
+    if changed:
+        commands = specializeCommands(
+            commands, generalizeFirst=False, maxstack=513 if CFF2 else 48
+        )
+        charString.program = commandsToProgram(commands)
+    return changed
+
+
+def equalizeCFF(
+    font: TTFont,
+    method: str = "balance",
+    glyphNames: List[str] | None = None,
+    **params,
+) -> Dict[str, List[str]]:
+    CFF2 = "CFF2" in font
+    cff = font["CFF2" if CFF2 else "CFF "].cff
+    # Curves inside subroutines could be shared by several glyphs, so the
+    # charstrings must be self-contained before they can be edited
+    cff.desubroutinize()
+    charStrings = cff.topDictIndex[0].CharStrings
+    if glyphNames is None:
+        glyphNames = font.getGlyphOrder()
+    changed = []
+    unchanged = []
+    for name in glyphNames:
+        if name not in charStrings:
+            continue
+
+        if equalizeCharString(charStrings[name], method, CFF2, **params):
+            changed.append(name)
+        else:
+            unchanged.append(name)
+    return {"changed": changed, "unchanged": unchanged}
+
+
+def main(args: List[str] | None = None) -> None:
+    from fontTools.ttLib import TTFont
+
+    parser = argparse.ArgumentParser(
+        description="Equalize the curves of a CFF or CFF2 based font."
+    )
+    parser.add_argument("input", help="Path to the input font")
+    parser.add_argument("output", help="Path to the output font")
+    parser.add_argument("-m", "--method", default="balance")
+    parser.add_argument("--curvature", type=float, default=None)
+    parser.add_argument("--tension", type=float, default=None)
+    options = parser.parse_args(args)
+
+    params = {}
+    if options.curvature is not None:
+        params["curvature"] = options.curvature
+    if options.tension is not None:
+        params["tension"] = options.tension
+
+    font = TTFont(options.input)
+    summary = equalizeCFF(font, options.method, **params)
+    font.save(options.output)
+    print(
+        f"Equalized {len(summary['changed'])} glyphs, "
+        f"{len(summary['unchanged'])} glyphs unchanged."
+    )
+
+
+if __name__ == "__main__":
+    main()
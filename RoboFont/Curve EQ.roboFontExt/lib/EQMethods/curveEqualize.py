@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from fontTools.misc.roundTools import otRound
+from ufo2ft.filters import BaseFilter
+
+from .batch import getMethodFunction
+
+"""
+ufo2ft filter to equalize curves at build time
+
+Add this to the "com.github.googlei18n.ufo2ft.filters" list in the UFO lib:
+
+    {
+        "name": "curveEqualize",
+        "namespace": "EQMethods",
+        "kwargs": {"method": "free", "curvature": 0.6},
+        "include": ["o", "c", "e"],
+    }
+
+The filter keeps no state besides its options, so it can run in ufo2ft's
+parallel compile workers.
+"""
+
+
+class CurveEqualizeFilter(BaseFilter):
+    _kwargs = {
+        "method": "balance",
+        "curvature": None,
+        "tension": None,
+    }
+
+    def start(self) -> None:
+        self.method = getMethodFunction(self.options.method)
+        self.params = {}
+        if self.options.curvature is not None:
+            self.params["curvature"] = self.options.curvature
+        if self.options.tension is not None:
+            self.params["tension"] = self.options.tension
+
+    def filter(self, glyph) -> bool:
+        modified = False
+        for contour in glyph:
+            points = list(contour)
+            if not points:
+                continue
+
+            closed = points[0].segmentType != "move"
+            for i, p3 in enumerate(points):
+                if p3.segmentType != "curve" or i < 3 and not closed:
+                    continue
+
+                p0, p1, p2 = points[i - 3], points[i - 2], points[i - 1]
+                if p0.segmentType is None or p1.segmentType or p2.segmentType:
+                    continue
+
+                before = p1.x, p1.y, p2.x, p2.y
+                self.method(p0, p1, p2, p3, **self.params)
+                p1.x, p1.y = otRound(p1.x), otRound(p1.y)
+                p2.x, p2.y = otRound(p2.x), otRound(p2.y)
+                if (p1.x, p1.y, p2.x, p2.y) != before:
+                    modified = True
+        return modified
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+from .batch import Handles, Segment, equalizeSegments
+from .headless import getCurveSegments, movePoint, writeChangedGlyphs
+
+if TYPE_CHECKING:
+    from fontParts.fontshell import RGlyph
+
+"""
+Master-compatible equalization of all sources of a designspace
+
+The curve segments of a glyph are matched across the masters by contour and
+segment index and equalized in one pass per glyph. Glyphs are spread over a
+process pool. Afterwards, the handle orientation of each segment is compared
+between the masters, because the zero-handle fallback of getNewCoordinates
+can point a handle in a different direction in one master than in the
+others. Such segments are left unchanged in all masters unless
+writeFlagged is set.
+
+Glyphs that are missing in some sources (sparse masters) are equalized and
+compared in the sources that contain them.
+"""
+
+
+def getHandleOrientation(segment: Segment, handles: Handles) -> Tuple[int, int]:
+    # On which side of the line p0-p3 the two handles are: 1, -1 or 0
+    (x0, y0), _, _, (x3, y3) = segment
+    x1, y1, x2, y2 = handles
+    dx = x3 - x0
+    dy = y3 - y0
+    cross1 = dx * (y1 - y0) - dy * (x1 - x0)
+    cross2 = dx * (y2 - y0) - dy * (x2 - x0)
+    return (cross1 > 0) - (cross1 < 0), (cross2 > 0) - (cross2 < 0)
+
+
+def _equalizeMasters(
+    args: Tuple[str, List[List[Segment]], str, Dict[str, Any]],
+) -> Tuple[str, List[List[Handles]], List[int]]:
+    # Equalize the segments of one glyph in all masters. Return the new
+    # handles per master and the indices of segments with differing handle
+    # orientation
+    name, masters, method, params = args
+    results = [equalizeSegments(segments, method, **params) for segments in masters]
+    flagged = []
+    for i in range(len(masters[0])):
+        orientations = {
+            getHandleOrientation(segments[i], handles[i])
+            for segments, handles in zip(masters, results)
+        }
+        if len(orientations) > 1:
+            flagged.append(i)
+    return name, results, flagged
+
+
+def _setHandles(glyph: RGlyph, contourIndex: int, i: int, handles: Handles) -> bool:
+    x1, y1, x2, y2 = handles
+    p1, p2, _ = glyph[contourIndex][i].points
+    moved1 = movePoint(p1, x1, y1)
+    moved2 = movePoint(p2, x2, y2)
+    return moved1 or moved2
+
+
+def equalizeDesignspace(
+    path: str,
+    method: str = "balance",
+    workers: int | None = None,
+    writeFlagged: bool = False,
+    **params,
+) -> Dict[str, Any]:
+    from fontParts.fontshell import RFont
+    from fontTools.designspaceLib import DesignSpaceDocument
+
+    doc = DesignSpaceDocument.fromfile(path)
+    fonts = {}
+    layers = []
+    for source in doc.sources:
+        if source.path not in fonts:
+            fonts[source.path] = RFont(source.path)
+        font = fonts[source.path]
+        if source.layerName is None:
+            layers.append(font.defaultLayer)
+        else:
+            layers.append(font.getLayer(source.layerName))
+
+    # All glyph names in the order of the sources
+    names = {}
+    for layer in layers:
+        names.update(dict.fromkeys(layer.keys()))
+
+    jobs = []
+    keys = {}
+    present = {}
+    missing = {}
+    incompatible = []
+    for name in names:
+        indices = [j for j, layer in enumerate(layers) if name in layer]
+        if len(indices) < len(layers):
+            missing[name] = [j for j in range(len(layers)) if j not in indices]
+        masters = [getCurveSegments(layers[j][name]) for j in indices]
+        glyph_keys = [(ci, si) for ci, si, _ in masters[0]]
+        if any([(ci, si) for ci, si, _ in m] != glyph_keys for m in masters[1:]):
+            incompatible.append(name)
+            continue
+
+        if glyph_keys:
+            keys[name] = glyph_keys
+            present[name] = indices
+            jobs.append((name, [[s for _, _, s in m] for m in masters], method, params))
+
+    changed = [set() for _ in layers]
+    flagged = []
+    with ProcessPoolExecutor(workers) as executor:
+        for name, results, flagged_indices in executor.map(
+            _equalizeMasters, jobs, chunksize=64
+        ):
+            skip = set() if writeFlagged else set(flagged_indices)
+            for j, handles in zip(present[name], results):
+                glyph = layers[j][name]
+                for i, ((ci, si), h) in enumerate(zip(keys[name], handles)):
+                    if i not in skip and _setHandles(glyph, ci, si, h):
+                        changed[j].add(name)
+            flagged.extend((name, *keys[name][i]) for i in flagged_indices)
+
+    return {
+        "sources": doc.sources,
+        "fonts": fonts,
+        "changed": changed,
+        "flagged": flagged,
+        "missing": missing,
+        "incompatible": incompatible,
+    }
+
+
+def main(args: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Equalize the curves of all sources of a designspace."
+    )
+    parser.add_argument("designspace", help="Path to the designspace file")
+    parser.add_argument("-m", "--method", default="balance")
+    parser.add_argument("--curvature", type=float, default=None)
+    parser.add_argument("--tension", type=float, default=None)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument(
+        "--write-flagged",
+        action="store_true",
+        help="Also write segments whose handle orientation differs between "
+        "the masters",
+    )
+    options = parser.parse_args(args)
+
+    params = {}
+    if options.curvature is not None:
+        params["curvature"] = options.curvature
+    if options.tension is not None:
+        params["tension"] = options.tension
+
+    summary = equalizeDesignspace(
+        options.designspace,
+        options.method,
+        options.workers,
+        options.write_flagged,
+        **params,
+    )
+    layer_sources = set()
+    for source, changed in zip(summary["sources"], summary["changed"]):
+        if source.layerName is None:
+            writeChangedGlyphs(summary["fonts"][source.path], sorted(changed))
+        else:
+            layer_sources.add(source.path)
+        print(f"{source.filename}: {len(changed)} glyphs changed")
+    for path in layer_sources:
+        summary["fonts"][path].save()
+
+    for name, indices in summary["missing"].items():
+        sources = ", ".join(summary["sources"][j].filename for j in indices)
+        print(f"/{name} is missing in {sources}, equalized in the other sources.")
+    for name in summary["incompatible"]:
+        print(f"WARNING: /{name} has incompatible segments, skipped.")
+    for name, contourIndex, segmentIndex in summary["flagged"]:
+        print(
+            f"WARNING: /{name} contour {contourIndex} segment {segmentIndex}: "
+            "handle orientation differs between masters"
+            + ("." if options.write_flagged else ", left unchanged.")
+        )
+
+
+if __name__ == "__main__":
+    main()
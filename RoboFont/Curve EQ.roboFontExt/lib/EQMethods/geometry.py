@@ -10,6 +10,23 @@ if TYPE_CHECKING:
 Triangle Geometry helpers
 """
 
+
+class Point:
+    """
+    A stand-in for RPoint or GSNode, used to calculate new handle positions
+    without touching the points of a glyph.
+    """
+
+    __slots__ = ("x", "y")
+
+    def __init__(self, x: float, y: float) -> None:
+        self.x = x
+        self.y = y
+
+    def __repr__(self) -> str:
+        return f"<Point {self.x}, {self.y}>"
+
+
 # helper functions
 
 
@@ -44,6 +61,50 @@ def distance(p0: RPoint, p1: RPoint, doRound: bool = False) -> float | int:
         return d
 
 
+def getCurveArea(p0: RPoint, p1: RPoint, p2: RPoint, p3: RPoint) -> float:
+    # Signed area enclosed by the cubic Bezier and the line p3-p0
+    x1 = p1.x - p0.x
+    y1 = p1.y - p0.y
+    x2 = p2.x - p0.x
+    y2 = p2.y - p0.y
+    x3 = p3.x - p0.x
+    y3 = p3.y - p0.y
+    return (
+        3 * (x1 * y2 - x2 * y1) + 3 * (x1 * y3 - x3 * y1) + 6 * (x2 * y3 - x3 * y2)
+    ) / 20
+
+
+# Nodes and weights of the 5-point Gauss-Legendre quadrature on [-1, 1]
+gauss_legendre = (
+    (0.0, 0.5688888888888889),
+    (-0.5384693101056831, 0.47862867049936647),
+    (0.5384693101056831, 0.47862867049936647),
+    (-0.906179845938664, 0.23692688505618908),
+    (0.906179845938664, 0.23692688505618908),
+)
+
+
+def getArcLength(
+    p0: RPoint, p1: RPoint, p2: RPoint, p3: RPoint, t0: float = 0, t1: float = 1
+) -> float:
+    # Length of the cubic Bezier between the parameters t0 and t1
+    ax = 3 * (p3.x - 3 * p2.x + 3 * p1.x - p0.x)
+    ay = 3 * (p3.y - 3 * p2.y + 3 * p1.y - p0.y)
+    bx = 6 * (p2.x - 2 * p1.x + p0.x)
+    by = 6 * (p2.y - 2 * p1.y + p0.y)
+    cx = 3 * (p1.x - p0.x)
+    cy = 3 * (p1.y - p0.y)
+    half = (t1 - t0) / 2
+    mid = (t1 + t0) / 2
+    length = 0
+    for x, w in gauss_legendre:
+        t = mid + half * x
+        dx = (ax * t + bx) * t + cx
+        dy = (ay * t + by) * t + cy
+        length += w * sqrt(dx * dx + dy * dy)
+    return length * half
+
+
 # Triangle Geometry
 
 # p0 is the first point of the Bezier segment and p3 the last point.
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import mmap
+import plistlib
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from fontTools.misc.roundTools import otRound
+
+from .batch import getMethodFunction
+from .geometry import Point
+
+"""
+Lean .glif reader and writer
+
+Only the <outline> element of a .glif file is parsed, and only the point
+coordinates and types. Anchors, guidelines, images and the lib are never
+looked at. Changed coordinates are patched back into the original text, the
+rest of the file is written back byte for byte.
+"""
+
+_outline_re = re.compile(rb"<outline\s*>(.*?)</outline\s*>", re.S)
+_contour_re = re.compile(rb"<contour\b[^>]*>(.*?)</contour\s*>", re.S)
+_point_re = re.compile(rb"<point\b[^>]*>")
+_attribute_re = re.compile(rb"""\b(x|y|type)\s*=\s*(["'])(.*?)\2""")
+
+
+class GlifPoint(Point):
+    __slots__ = ("type", "spans", "original")
+
+    def __init__(self, x: float, y: float, type: str | None = None) -> None:
+        super().__init__(x, y)
+        self.type = type
+        # Positions of the x and y attribute values in the file
+        self.spans: Dict[str, Tuple[int, int]] = {}
+        self.original = (x, y)
+
+    def round(self) -> None:
+        self.x = otRound(self.x)
+        self.y = otRound(self.y)
+
+    @property
+    def changed(self) -> bool:
+        return (self.x, self.y) != self.original
+
+
+def _number(value: bytes) -> float:
+    number = float(value)
+    if number.is_integer():
+        return int(number)
+    return number
+
+
+def _format(number: float) -> bytes:
+    if float(number).is_integer():
+        return str(int(number)).encode("ascii")
+    return repr(float(number)).encode("ascii")
+
+
+class GlifOutline:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.contours: List[List[GlifPoint]] = []
+        outline = _outline_re.search(data)
+        if outline is None:
+            return
+
+        for contour in _contour_re.finditer(data, outline.start(1), outline.end(1)):
+            points = []
+            for point in _point_re.finditer(data, contour.start(1), contour.end(1)):
+                attributes = {}
+                spans = {}
+                for attribute in _attribute_re.finditer(
+                    data, point.start(), point.end()
+                ):
+                    name = attribute.group(1).decode("ascii")
+                    attributes[name] = attribute.group(3)
+                    spans[name] = attribute.span(3)
+                p = GlifPoint(
+                    _number(attributes["x"]),
+                    _number(attributes["y"]),
+                    attributes.get("type", b"offcurve").decode("ascii"),
+                )
+                p.spans = spans
+                points.append(p)
+            self.contours.append(points)
+
+    @classmethod
+    def read(cls, path: str | Path) -> GlifOutline:
+        # The outline is parsed from the mapped file without copying it, the
+        # mapping stays open until close()
+        with open(path, "rb") as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # Empty files or file systems without mmap support
+                f.seek(0)
+                data = f.read()
+        return cls(data)
+
+    def __enter__(self) -> GlifOutline:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def segments(self) -> Iterator[Tuple[GlifPoint, GlifPoint, GlifPoint, GlifPoint]]:
+        # Yield (p0, p1, p2, p3) for each cubic curve segment
+        for points in self.contours:
+            if not points:
+                continue
+
+            closed = points[0].type != "move"
+            for i, p3 in enumerate(points):
+                if p3.type != "curve" or i < 3 and not closed:
+                    continue
+
+                p0, p1, p2 = points[i - 3], points[i - 2], points[i - 1]
+                if p1.type == "offcurve" and p2.type == "offcurve":
+                    if p0.type != "offcurve":
+                        yield p0, p1, p2, p3
+
+    @property
+    def changed(self) -> bool:
+        return any(p.changed for points in self.contours for p in points)
+
+    def equalize(self, method: str = "balance", **params) -> bool:
+        # Equalize all curve segments, return True if any point has moved
+        func = getMethodFunction(method)
+        for p0, p1, p2, p3 in self.segments():
+            func(p0, p1, p2, p3, **params)
+            p1.round()
+            p2.round()
+        return self.changed
+
+    def patch(self) -> bytes:
+        # Return the original data with the changed coordinates replaced
+        replacements = []
+        for points in self.contours:
+            for p in points:
+                if p.changed:
+                    replacements.append((p.spans["x"], _format(p.x)))
+                    replacements.append((p.spans["y"], _format(p.y)))
+        replacements.sort()
+        parts = []
+        pos = 0
+        for (start, end), value in replacements:
+            parts.append(self.data[pos:start])
+            parts.append(value)
+            pos = end
+        parts.append(self.data[pos:])
+        return b"".join(parts)
+
+    def write(self, path: str | Path) -> None:
+        data = self.patch()
+        # A mapped file can't be truncated on all platforms, the outline can't
+        # be patched again after this
+        self.close()
+        with open(path, "wb") as f:
+            f.write(data)
+
+
+def getLayerDirectory(ufo: str | Path, layerName: str | None = None) -> Path:
+    # Return the glyphs directory of a layer, by default the default layer
+    ufo = Path(ufo)
+    try:
+        with open(ufo / "layercontents.plist", "rb") as f:
+            layerContents = dict(plistlib.load(f))
+    except FileNotFoundError:
+        # UFO 2 has only the default layer
+        layerContents = {"public.default": "glyphs"}
+    if layerName is None:
+        # The default layer is the one in the glyphs directory
+        for name, directory in layerContents.items():
+            if directory == "glyphs":
+                layerName = name
+                break
+    if layerName not in layerContents:
+        raise KeyError(f"No layer {layerName!r} in {ufo}")
+
+    return ufo / layerContents[layerName]
+
+
+def equalizeGlyphsDirectory(
+    path: str | Path, method: str = "balance", **params
+) -> Dict[str, List[str]]:
+    # Equalize all .glif files of a UFO layer directory, rewrite only the
+    # changed files
+    path = Path(path)
+    with open(path / "contents.plist", "rb") as f:
+        contents = plistlib.load(f)
+    rewritten = []
+    skipped = []
+    for fileName in sorted(contents.values()):
+        with GlifOutline.read(path / fileName) as outline:
+            if outline.equalize(method, **params):
+                outline.write(path / fileName)
+                rewritten.append(fileName)
+            else:
+                skipped.append(fileName)
+    return {"rewritten": rewritten, "skipped": skipped}
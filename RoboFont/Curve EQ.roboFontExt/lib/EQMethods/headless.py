@@ -0,0 +1,400 @@
+from __future__ import annotations
+
+import argparse
+import plistlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+from fontTools.misc.roundTools import otRound
+
+from .Auto import chooseMethod
+from .batch import Segment, equalizeSegment
+from .cache import ResultCache
+from .G2 import eqG2, getChains
+from .geometry import Point
+from .glif import equalizeGlyphsDirectory, getLayerDirectory
+from .merge import mergeGlyphSegments
+
+if TYPE_CHECKING:
+    from fontParts.fontshell import RFont, RGlyph, RLayer, RPoint
+    from fontTools.ufoLib.glifLib import GlyphSet
+
+"""
+Equalize curves without a font editor
+
+This works on fontParts objects, e.g. from fontParts.fontshell, and uses the
+same method names and rounding as the RoboFont extension.
+"""
+
+
+def getCurveSegments(
+    glyph: RGlyph, selectedOnly: bool = False
+) -> List[Tuple[int, int, Segment]]:
+    # Return (contour index, segment index, segment coordinates) for each
+    # cubic curve segment of the glyph
+    segments = []
+    for contourIndex, contour in enumerate(glyph):
+        # The segments are built on each access, get them only once
+        contourSegments = contour.segments
+        for i, segment in enumerate(contourSegments):
+            if selectedOnly and not segment.selected:
+                continue
+
+            if segment.type == "curve" and len(segment.points) == 3:
+                p0 = contourSegments[i - 1][-1]
+                segments.append(
+                    (
+                        contourIndex,
+                        i,
+                        tuple((p.x, p.y) for p in (p0, *segment.points)),
+                    )
+                )
+    return segments
+
+
+def getPointCoordinates(glyph: RGlyph) -> List[List[Tuple[float, float]]]:
+    return [[(p.x, p.y) for p in contour.points] for contour in glyph]
+
+
+def setPointCoordinates(
+    glyph: RGlyph, coordinates: List[List[Tuple[float, float]]]
+) -> None:
+    for contour, contour_coordinates in zip(glyph, coordinates):
+        for p, (x, y) in zip(contour.points, contour_coordinates):
+            if (p.x, p.y) != (x, y):
+                p.x = x
+                p.y = y
+
+
+def movePoint(point: RPoint, x: float, y: float) -> bool:
+    # Round like RPoint.round() and only assign the coordinates if the point
+    # moves, so unchanged glyphs don't get change notifications
+    x = otRound(x)
+    y = otRound(y)
+    if (point.x, point.y) == (x, y):
+        return False
+
+    point.x = x
+    point.y = y
+    return True
+
+
+def countQuadraticPoints(glyph: RGlyph, maxError: float = 1.0) -> int:
+    # Number of off-curve points cu2qu needs to convert the curves of the
+    # glyph to quadratic curves
+    from fontTools.cu2qu import curve_to_quadratic
+
+    count = 0
+    for _, _, segment in getCurveSegments(glyph):
+        count += len(curve_to_quadratic(segment, maxError)) - 2
+    return count
+
+
+def equalizeGlyphG2(glyph: RGlyph, selectedOnly: bool = False) -> None:
+    # The G2 method works on chains of consecutive curve segments
+    for contour in glyph:
+        segments = []
+        for i, segment in enumerate(contour):
+            if (
+                segment.type == "curve"
+                and len(segment.points) == 3
+                and (not selectedOnly or segment.selected)
+            ):
+                segments.append((contour[i - 1][-1], *segment.points))
+            else:
+                segments.append(None)
+        for chain, cyclic in getChains(segments, not contour.open):
+            # Calculate on copies, then move the handles that change
+            points = [[Point(p.x, p.y) for p in segments[i]] for i in chain]
+            eqG2(points, [segments[i][3].smooth for i in chain], cyclic)
+            for i, (_, p1, p2, _) in zip(chain, points):
+                movePoint(segments[i][1], p1.x, p1.y)
+                movePoint(segments[i][2], p2.x, p2.y)
+
+
+def equalizeGlyph(
+    glyph: RGlyph,
+    method: str = "balance",
+    selectedOnly: bool = False,
+    cache: ResultCache | None = None,
+    winners: List[Tuple[int, int, str]] | None = None,
+    **params,
+) -> bool:
+    # Return True if any point coordinates have changed after rounding. For
+    # the auto method, (contour index, segment index, method) of the winning
+    # method of each segment is appended to winners.
+    before = getPointCoordinates(glyph)
+    if cache is not None:
+        key = cache.getKey(glyph, method, params, selectedOnly)
+        coordinates = cache.get(key)
+        if coordinates is not None:
+            setPointCoordinates(glyph, coordinates)
+            return getPointCoordinates(glyph) != before
+
+    if method == "g2":
+        equalizeGlyphG2(glyph, selectedOnly)
+    else:
+        for contourIndex, i, segment in getCurveSegments(glyph, selectedOnly):
+            if method == "auto" and winners is not None:
+                winner, (x1, y1, x2, y2) = chooseMethod(
+                    *[Point(x, y) for x, y in segment], **params
+                )
+                winners.append((contourIndex, i, winner))
+            else:
+                x1, y1, x2, y2 = equalizeSegment(segment, method, **params)
+            p1, p2, _ = glyph[contourIndex][i].points
+            movePoint(p1, x1, y1)
+            movePoint(p2, x2, y2)
+
+    after = getPointCoordinates(glyph)
+    if cache is not None:
+        cache.set(key, after)
+    return after != before
+
+
+def equalizeFont(
+    font: RFont,
+    method: str = "balance",
+    glyphNames: List[str] | None = None,
+    cache: ResultCache | None = None,
+    mergeTolerance: float | None = None,
+    **params,
+) -> Dict[str, Any]:
+    if glyphNames is None:
+        glyphNames = font.glyphOrder
+    glyphs = 0
+    changed = []
+    # For the quadratic method, count the points of the TrueType outlines
+    # before and after, using the same tolerance as ufo2ft
+    quadraticPoints = {}
+    autoWinners = {}
+    removedPoints = {}
+    maxError = (font.info.unitsPerEm or 1000) * 0.001
+    for name in glyphNames:
+        if name not in font:
+            continue
+
+        glyph = font[name]
+        if method == "quadratic":
+            before = countQuadraticPoints(glyph, maxError)
+        winners = []
+        changed_glyph = equalizeGlyph(
+            glyph, method, cache=cache, winners=winners, **params
+        )
+        if mergeTolerance is not None:
+            removed = mergeGlyphSegments(glyph, mergeTolerance)
+            if removed:
+                removedPoints[name] = removed
+                changed_glyph = True
+        if changed_glyph:
+            changed.append(name)
+            if method == "quadratic":
+                quadraticPoints[name] = (before, countQuadraticPoints(glyph, maxError))
+        if winners:
+            autoWinners[name] = winners
+        glyphs += 1
+
+    summary = {"glyphs": glyphs, "changed": changed}
+    if method == "quadratic":
+        summary["quadraticPoints"] = quadraticPoints
+    elif method == "auto":
+        summary["autoWinners"] = autoWinners
+    if mergeTolerance is not None:
+        summary["removedPoints"] = removedPoints
+    if cache is not None:
+        summary["cacheHits"] = cache.hits
+        summary["cacheMisses"] = cache.misses
+    return summary
+
+
+def unloadGlyph(layer: RLayer, name: str) -> None:
+    # Drop a loaded glyph without unsaved changes from the layer, so its
+    # memory can be freed. It is read from its file again when it is needed.
+    naked = layer.naked()
+    glyph = naked._glyphs.get(name)
+    if glyph is None or glyph.dirty:
+        return
+
+    naked.endSelfGlyphNotificationObservation(glyph)
+    del naked._glyphs[name]
+
+
+def getGlyphSet(font: RFont, layerName: str) -> GlyphSet:
+    # The glyph set of a layer of a fontshell font, for writing single
+    # .glif files
+    from fontTools.ufoLib import UFOReader
+    from fontTools.ufoLib.glifLib import GlyphSet
+
+    path = Path(font.path)
+    reader = UFOReader(path, validate=False)
+    with open(path / "layercontents.plist", "rb") as f:
+        layerContents = dict(plistlib.load(f))
+    return GlyphSet(
+        path / layerContents[layerName],
+        ufoFormatVersion=reader.formatVersionTuple,
+        validateRead=False,
+    )
+
+
+def writeChangedGlyphs(
+    font: RFont, glyphNames: List[str], layerName: str | None = None
+) -> Dict[str, List[str]]:
+    # Write only the .glif files of the given glyphs in a layer, by default
+    # the default layer, of a fontshell font. contents.plist,
+    # layercontents.plist and metainfo.plist are left untouched.
+    if layerName is None:
+        layerName = font.defaultLayerName
+    layer = font.getLayer(layerName)
+    glyphSet = getGlyphSet(font, layerName)
+    changed = set(glyphNames)
+    rewritten = []
+    skipped = []
+    for name, fileName in sorted(glyphSet.contents.items()):
+        if name not in changed:
+            skipped.append(fileName)
+            continue
+
+        glyph = layer[name].naked()
+        glyphSet.writeGlyph(name, glyph, drawPointsFunc=glyph.drawPoints)
+        rewritten.append(fileName)
+    return {"rewritten": rewritten, "skipped": skipped}
+
+
+def main(args: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Equalize the curves of a UFO.")
+    parser.add_argument("ufo", help="Path to the UFO")
+    parser.add_argument("-m", "--method", default="balance")
+    parser.add_argument("--curvature", type=float, default=None)
+    parser.add_argument("--tension", type=float, default=None)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=None,
+        help="Tolerance in units for the quadratic method",
+    )
+    parser.add_argument(
+        "--objective",
+        default=None,
+        help="Objective of the auto method, a measure name or weights like "
+        "smoothness=1,area=2,symmetry=0",
+    )
+    parser.add_argument(
+        "--merge",
+        type=float,
+        default=None,
+        metavar="TOLERANCE",
+        help="Merge pairs of curve segments at smooth points that deviate "
+        "less than the tolerance in units from a single curve (not with --lean)",
+    )
+    parser.add_argument("--cache", help="Directory for the result cache")
+    parser.add_argument(
+        "--full-save",
+        action="store_true",
+        help="Save the whole UFO instead of only the changed .glif files",
+    )
+    parser.add_argument(
+        "--lean",
+        action="store_true",
+        help="Patch the .glif files of the default layer directly, without "
+        "loading the font. Not with --cache, --merge or --full-save",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="List the skipped files and the winning method of each segment",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=256,
+        help="Maximum size of the result cache in MB",
+    )
+    options = parser.parse_args(args)
+    if options.lean:
+        for flag, given in (
+            ("--cache", options.cache is not None),
+            ("--merge", options.merge is not None),
+            ("--full-save", options.full_save),
+        ):
+            if given:
+                parser.error(f"--lean can't be combined with {flag}")
+
+    params = {}
+    if options.curvature is not None:
+        params["curvature"] = options.curvature
+    if options.tension is not None:
+        params["tension"] = options.tension
+    if options.tolerance is not None:
+        params["tolerance"] = options.tolerance
+    if options.objective is not None:
+        if "=" in options.objective:
+            params["objective"] = {
+                key: float(value)
+                for key, value in (
+                    item.split("=") for item in options.objective.split(",")
+                )
+            }
+        else:
+            params["objective"] = options.objective
+
+    cache = None
+    if options.cache:
+        cache = ResultCache(options.cache, options.cache_size * 1024 * 1024)
+
+    if options.lean:
+        files = equalizeGlyphsDirectory(
+            getLayerDirectory(options.ufo), options.method, **params
+        )
+    else:
+        from fontParts.fontshell import RFont
+
+        font = RFont(options.ufo)
+        summary = equalizeFont(
+            font, options.method, cache=cache, mergeTolerance=options.merge, **params
+        )
+        print(f"Equalized {summary['glyphs']} glyphs.")
+        if "quadraticPoints" in summary:
+            saved = 0
+            for name, (before, after) in summary["quadraticPoints"].items():
+                print(f"    /{name}: {before} -> {after} quadratic off-curve points")
+                saved += before - after
+            print(f"Saved {saved} quadratic off-curve points.")
+        if "removedPoints" in summary:
+            for name, removed in summary["removedPoints"].items():
+                print(f"    /{name}: removed {removed} points")
+            print(
+                f"Removed {sum(summary['removedPoints'].values())} points by "
+                "merging segments."
+            )
+        if "autoWinners" in summary:
+            counts = {}
+            for name, winners in summary["autoWinners"].items():
+                for contourIndex, segmentIndex, winner in winners:
+                    counts[winner] = counts.get(winner, 0) + 1
+                    if options.verbose:
+                        print(
+                            f"    /{name} contour {contourIndex} segment "
+                            f"{segmentIndex}: {winner}"
+                        )
+            for winner, count in sorted(counts.items()):
+                print(f"Auto: {winner} won {count} segments.")
+        if options.full_save:
+            font.save()
+            files = None
+        else:
+            files = writeChangedGlyphs(font, summary["changed"])
+    if files is not None:
+        print(f"Rewrote {len(files['rewritten'])} .glif files:")
+        for fileName in files["rewritten"]:
+            print(f"    {fileName}")
+        print(f"Skipped {len(files['skipped'])} unchanged .glif files.")
+        if options.verbose:
+            for fileName in files["skipped"]:
+                print(f"    {fileName}")
+    if cache is not None:
+        print(cache.report())
+
+
+if __name__ == "__main__":
+    main()
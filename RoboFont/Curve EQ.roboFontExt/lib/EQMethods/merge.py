@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+from math import sqrt
+from typing import TYPE_CHECKING, Tuple
+
+from fontTools.misc.roundTools import otRound
+
+from .batch import Coordinates, Handles
+
+if TYPE_CHECKING:
+    from fontParts.fontshell import RContour, RGlyph
+
+"""
+Merge pairs of curve segments after equalizing
+
+Two curve segments that meet in a smooth point can often be replaced by a
+single cubic. The merged cubic keeps the outer handle directions of the
+pair, its two handle lengths are a least squares fit to points sampled on
+the pair. The samples start at the parameters of the pair as if it had been
+split at the smooth point; after each fit, they are projected onto the new
+curve and the fit is repeated. The pair is only merged if the points
+sampled on the pair are within the tolerance of the rounded merged curve,
+and the points sampled on the merged curve are within the tolerance of the
+pair.
+"""
+
+# Number of intervals at which each segment of the pair is sampled
+merge_samples = 16
+
+# Number of fits, each one after projecting the samples onto the last fit
+fit_iterations = 3
+
+# Newton iterations to project a point onto a curve
+projection_iterations = 4
+
+SegmentPair = Tuple[
+    Coordinates,
+    Coordinates,
+    Coordinates,
+    Coordinates,
+    Coordinates,
+    Coordinates,
+    Coordinates,
+]
+
+
+def getCubicPoint(
+    p0: Coordinates, p1: Coordinates, p2: Coordinates, p3: Coordinates, t: float
+) -> Coordinates:
+    mt = 1 - t
+    a = mt * mt * mt
+    b = 3 * mt * mt * t
+    c = 3 * mt * t * t
+    d = t * t * t
+    return (
+        a * p0[0] + b * p1[0] + c * p2[0] + d * p3[0],
+        a * p0[1] + b * p1[1] + c * p2[1] + d * p3[1],
+    )
+
+
+def getSquaredDistance(a: Coordinates, b: Coordinates) -> float:
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2
+
+
+def getClosestParameter(
+    p0: Coordinates,
+    p1: Coordinates,
+    p2: Coordinates,
+    p3: Coordinates,
+    point: Coordinates,
+    t: float,
+) -> float:
+    # Parameter of the point on the cubic that is closest to the given point,
+    # found by Newton's method starting at the parameter t
+    ax = 3 * (p3[0] - 3 * p2[0] + 3 * p1[0] - p0[0])
+    ay = 3 * (p3[1] - 3 * p2[1] + 3 * p1[1] - p0[1])
+    bx = 6 * (p2[0] - 2 * p1[0] + p0[0])
+    by = 6 * (p2[1] - 2 * p1[1] + p0[1])
+    cx = 3 * (p1[0] - p0[0])
+    cy = 3 * (p1[1] - p0[1])
+    for _ in range(projection_iterations):
+        x, y = getCubicPoint(p0, p1, p2, p3, t)
+        dx = (ax * t + bx) * t + cx
+        dy = (ay * t + by) * t + cy
+        ddx = 2 * ax * t + bx
+        ddy = 2 * ay * t + by
+        ex = x - point[0]
+        ey = y - point[1]
+        derivative = dx * dx + dy * dy + ex * ddx + ey * ddy
+        if derivative <= 0:
+            break
+
+        t = min(1, max(0, t - (ex * dx + ey * dy) / derivative))
+    return t
+
+
+def getCurveDistance(
+    p0: Coordinates,
+    p1: Coordinates,
+    p2: Coordinates,
+    p3: Coordinates,
+    point: Coordinates,
+) -> float:
+    # Distance from the point to the cubic, projected from the closest of the
+    # sampled parameters
+    t = min(
+        (i / merge_samples for i in range(merge_samples + 1)),
+        key=lambda t: getSquaredDistance(getCubicPoint(p0, p1, p2, p3, t), point),
+    )
+    x, y = getCubicPoint(p0, p1, p2, p3, getClosestParameter(p0, p1, p2, p3, point, t))
+    return sqrt((x - point[0]) ** 2 + (y - point[1]) ** 2)
+
+
+def fitSegmentPair(pair: SegmentPair, tolerance: float) -> Handles | None:
+    # Return the rounded handles (x1, y1, x2, y2) of a single cubic from the
+    # first to the last point of the pair, or None if it deviates from the
+    # pair by more than the tolerance
+    p0, p1, p2, p3, p4, p5, p6 = pair
+    l0 = sqrt((p3[0] - p2[0]) ** 2 + (p3[1] - p2[1]) ** 2)
+    l1 = sqrt((p4[0] - p3[0]) ** 2 + (p4[1] - p3[1]) ** 2)
+    d0 = sqrt((p1[0] - p0[0]) ** 2 + (p1[1] - p0[1]) ** 2)
+    d1 = sqrt((p5[0] - p6[0]) ** 2 + (p5[1] - p6[1]) ** 2)
+    if l0 == 0 or l1 == 0 or d0 == 0 or d1 == 0:
+        return None
+
+    # Unit vectors of the outer handles
+    u = ((p1[0] - p0[0]) / d0, (p1[1] - p0[1]) / d0)
+    v = ((p5[0] - p6[0]) / d1, (p5[1] - p6[1]) / d1)
+
+    t = l0 / (l0 + l1)
+    samples = []
+    for i in range(merge_samples + 1):
+        k = i / merge_samples
+        samples.append((getCubicPoint(p0, p1, p2, p3, k), k * t))
+        samples.append((getCubicPoint(p3, p4, p5, p6, k), t + k * (1 - t)))
+
+    for _ in range(fit_iterations):
+        # Normal equations for the handle lengths a and b, with the curve
+        # B(s) = p0 + (b2 + b3) * (p6 - p0) + b1 * a * u + b2 * b * v
+        c11 = c12 = c22 = r1 = r2 = 0
+        for (x, y), s in samples:
+            ms = 1 - s
+            b1 = 3 * ms * ms * s
+            b2 = 3 * ms * s * s
+            b3 = s * s * s
+            ex = x - p0[0] - (b2 + b3) * (p6[0] - p0[0])
+            ey = y - p0[1] - (b2 + b3) * (p6[1] - p0[1])
+            uu = (b1 * u[0], b1 * u[1])
+            vv = (b2 * v[0], b2 * v[1])
+            c11 += uu[0] * uu[0] + uu[1] * uu[1]
+            c12 += uu[0] * vv[0] + uu[1] * vv[1]
+            c22 += vv[0] * vv[0] + vv[1] * vv[1]
+            r1 += uu[0] * ex + uu[1] * ey
+            r2 += vv[0] * ex + vv[1] * ey
+        det = c11 * c22 - c12 * c12
+        if det == 0:
+            return None
+
+        a = (r1 * c22 - r2 * c12) / det
+        b = (r2 * c11 - r1 * c12) / det
+        if a <= 0 or b <= 0:
+            return None
+
+        q1 = (p0[0] + u[0] * a, p0[1] + u[1] * a)
+        q2 = (p6[0] + v[0] * b, p6[1] + v[1] * b)
+        samples = [
+            (point, getClosestParameter(p0, q1, q2, p6, point, s))
+            for point, s in samples
+        ]
+
+    # The handles are written as integers, so the rounded curve must be
+    # within the tolerance of the pair, and the pair within the tolerance of
+    # the rounded curve
+    q1 = (otRound(q1[0]), otRound(q1[1]))
+    q2 = (otRound(q2[0]), otRound(q2[1]))
+    steps = 4 * merge_samples
+    for i in range(steps + 1):
+        k = i / steps
+        for point in (
+            getCubicPoint(p0, p1, p2, p3, k),
+            getCubicPoint(p3, p4, p5, p6, k),
+        ):
+            if getCurveDistance(p0, q1, q2, p6, point) > tolerance:
+                return None
+
+        point = getCubicPoint(p0, q1, q2, p6, k)
+        if (
+            getCurveDistance(p0, p1, p2, p3, point) > tolerance
+            and getCurveDistance(p3, p4, p5, p6, point) > tolerance
+        ):
+            return None
+
+    return q1[0], q1[1], q2[0], q2[1]
+
+
+def mergeContourSegments(
+    contour: RContour, tolerance: float, selectedOnly: bool = False
+) -> int:
+    # Merge pairs of curve segments of the contour, return the number of
+    # removed points. The last segment is not paired with the first one, so
+    # the start point of the contour stays where it is.
+    removed = 0
+    i = 0
+    while i + 1 < len(contour.segments):
+        segments = contour.segments
+        first = segments[i]
+        second = segments[i + 1]
+        if (
+            first.type != "curve"
+            or second.type != "curve"
+            or len(first.points) != 3
+            or len(second.points) != 3
+            or not first.onCurve.smooth
+            or selectedOnly
+            and not (first.selected and second.selected)
+        ):
+            i += 1
+            continue
+
+        p0 = segments[i - 1].onCurve
+        pair = tuple((p.x, p.y) for p in (p0, *first.points, *second.points))
+        handles = fitSegmentPair(pair, tolerance)
+        if handles is None:
+            i += 1
+            continue
+
+        # Keep i, the merged segment may be merged with the next one
+        x1, y1, x2, y2 = handles
+        p1, p2, p3 = first.points
+        p4, p5, _ = second.points
+        p1.x = x1
+        p1.y = y1
+        p5.x = x2
+        p5.y = y2
+        for p in (p2, p3, p4):
+            contour.removePoint(p)
+        removed += 3
+    return removed
+
+
+def mergeGlyphSegments(
+    glyph: RGlyph, tolerance: float, selectedOnly: bool = False
+) -> int:
+    # Return the number of removed points
+    return sum(
+        mergeContourSegments(contour, tolerance, selectedOnly) for contour in glyph
+    )
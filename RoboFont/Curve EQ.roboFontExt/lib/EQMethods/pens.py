@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from typing import Tuple
+
+from fontTools.pens.filterPen import FilterPen
+
+from .batch import getMethodFunction
+from .geometry import Point
+
+"""
+Equalize curves while they are drawn into another pen
+
+Only the current point and the current curveTo are kept, so the pen can be
+used in any draw chain without making a copy of the glyph.
+"""
+
+
+class EqualizePen(FilterPen):
+    """
+    A filter pen that applies an EQMethods method to every cubic curve
+    segment and passes the result on to outPen. method and params are the
+    same as for EQMethods.batch.equalizeSegment.
+    """
+
+    def __init__(self, outPen, method: str = "balance", **params) -> None:
+        super().__init__(outPen)
+        self.method = getMethodFunction(method)
+        self.params = params
+        self.current: Tuple[float, float] | None = None
+
+    def moveTo(self, pt: Tuple[float, float]) -> None:
+        self._outPen.moveTo(pt)
+        self.current = pt
+
+    def lineTo(self, pt: Tuple[float, float]) -> None:
+        self._outPen.lineTo(pt)
+        self.current = pt
+
+    def curveTo(self, *points: Tuple[float, float]) -> None:
+        if len(points) == 3 and self.current is not None:
+            p0 = Point(*self.current)
+            p1, p2, p3 = [Point(*pt) for pt in points]
+            p1, p2 = self.method(p0, p1, p2, p3, **self.params)
+            points = ((p1.x, p1.y), (p2.x, p2.y), points[2])
+        self._outPen.curveTo(*points)
+        self.current = points[-1]
+
+    def qCurveTo(self, *points: Tuple[float, float] | None) -> None:
+        self._outPen.qCurveTo(*points)
+        self.current = points[-1]
+
+    def closePath(self) -> None:
+        self._outPen.closePath()
+        self.current = None
+
+    def endPath(self) -> None:
+        self._outPen.endPath()
+        self.current = None
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable, List, Sequence
+
+from .geometry import Point
+
+if TYPE_CHECKING:
+    from fontParts.fontshell import RPoint
+
+"""
+Equalize quadratic B-spline segments (TrueType "qcurve")
+
+A qcurve segment with n off-curve points has n - 1 implied on-curve points.
+Its end tangents point from p0 to the first off-curve point and from p3 to
+the last off-curve point. At the segment ends, a quadratic off-curve point
+corresponds to a cubic handle at 2/3 of its distance from the on-curve point.
+
+The first and last off-curve points are converted to these virtual cubic
+handles, equalized with the chosen cubic method and converted back. The
+inner off-curve points are moved by the displacement of the outer ones,
+interpolated by their position in the segment.
+
+A segment with a single off-curve point is left alone: its off-curve point
+must be the intersection of the tangents, so there is nothing to equalize.
+"""
+
+
+def eqQCurve(
+    p0: RPoint,
+    offCurves: Sequence[RPoint],
+    p3: RPoint,
+    equalize: Callable,
+) -> List[RPoint]:
+    n = len(offCurves)
+    if n < 2:
+        return list(offCurves)
+
+    q1 = offCurves[0]
+    qn = offCurves[-1]
+
+    # Virtual cubic handles
+    h1 = Point(p0.x + (q1.x - p0.x) * 2 / 3, p0.y + (q1.y - p0.y) * 2 / 3)
+    h2 = Point(p3.x + (qn.x - p3.x) * 2 / 3, p3.y + (qn.y - p3.y) * 2 / 3)
+    h1, h2 = equalize(p0, h1, h2, p3)
+
+    dx1 = p0.x + (h1.x - p0.x) * 1.5 - q1.x
+    dy1 = p0.y + (h1.y - p0.y) * 1.5 - q1.y
+    dxn = p3.x + (h2.x - p3.x) * 1.5 - qn.x
+    dyn = p3.y + (h2.y - p3.y) * 1.5 - qn.y
+
+    for i, q in enumerate(offCurves):
+        t = i / (n - 1)
+        q.x += dx1 * (1 - t) + dxn * t
+        q.y += dy1 * (1 - t) + dyn * t
+    return list(offCurves)
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from math import hypot
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+from .batch import Handles, Segment, equalizeSegments
+from .headless import getCurveSegments, writeChangedGlyphs
+
+if TYPE_CHECKING:
+    from fontParts.fontshell import RFont
+
+"""
+Find the curve segments of a font that are furthest from being equalized
+
+For each curve segment, the handles that the chosen method would produce are
+calculated, without changing the glyph. The deviation of a segment is the
+larger of the distances its two handles would move. The segments of a glyph
+are equalized as one batch, and the glyphs are spread over a process pool.
+
+The result is a list of all segments above a threshold, worst first, so the
+worst offenders can be fixed first. The segments can also be selected or
+their glyphs marked.
+"""
+
+Deviation = Tuple[float, str, int, int]
+
+# Mark color for glyphs with flagged segments
+mark_color = (1, 0.5, 0, 0.5)
+
+
+def getHandleDeviation(segment: Segment, handles: Handles) -> float:
+    _, (x1, y1), (x2, y2), _ = segment
+    nx1, ny1, nx2, ny2 = handles
+    return max(hypot(nx1 - x1, ny1 - y1), hypot(nx2 - x2, ny2 - y2))
+
+
+def _scanGlyph(
+    args: Tuple[str, List[Tuple[int, int, Segment]], str, Dict[str, Any]],
+) -> Tuple[str, List[Tuple[int, int, float]]]:
+    name, segments, method, params = args
+    results = equalizeSegments([s for _, _, s in segments], method, **params)
+    return name, [
+        (contourIndex, i, getHandleDeviation(segment, handles))
+        for (contourIndex, i, segment), handles in zip(segments, results)
+    ]
+
+
+def scanFont(
+    font: RFont,
+    method: str = "balance",
+    threshold: float = 1.0,
+    glyphNames: List[str] | None = None,
+    workers: int | None = None,
+    **params,
+) -> List[Deviation]:
+    # Return (deviation, glyph name, contour index, segment index) of all
+    # segments that deviate more than the threshold, worst first
+    if glyphNames is None:
+        glyphNames = font.glyphOrder
+    jobs = []
+    for name in glyphNames:
+        if name not in font:
+            continue
+
+        segments = getCurveSegments(font[name])
+        if segments:
+            jobs.append((name, segments, method, params))
+
+    flagged = []
+    with ProcessPoolExecutor(workers) as executor:
+        for name, deviations in executor.map(_scanGlyph, jobs, chunksize=64):
+            for contourIndex, i, deviation in deviations:
+                if deviation > threshold:
+                    flagged.append((deviation, name, contourIndex, i))
+    flagged.sort(key=lambda item: (-item[0], item[1:]))
+    return flagged
+
+
+def selectFlaggedSegments(font: RFont, flagged: List[Deviation]) -> None:
+    # Select the flagged segments, so the Curve Equalizer applies to them
+    # when the glyph is opened. This needs a font editor that supports the
+    # selection, like RoboFont.
+    for _, name, contourIndex, i in flagged:
+        font[name][contourIndex][i].selected = True
+
+
+def markFlaggedGlyphs(font: RFont, flagged: List[Deviation]) -> List[str]:
+    names = sorted({name for _, name, _, _ in flagged})
+    for name in names:
+        font[name].markColor = mark_color
+    return names
+
+
+def main(args: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="List the curve segments of a UFO that deviate most from "
+        "the chosen equalize method."
+    )
+    parser.add_argument("ufo", help="Path to the UFO")
+    parser.add_argument("-m", "--method", default="balance")
+    parser.add_argument("--curvature", type=float, default=None)
+    parser.add_argument("--tension", type=float, default=None)
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=1.0,
+        help="Minimum handle deviation in units to list a segment",
+    )
+    parser.add_argument(
+        "-n", "--top", type=int, default=None, help="List only the worst segments"
+    )
+    parser.add_argument(
+        "--mark",
+        action="store_true",
+        help="Set the mark color of the glyphs with listed segments",
+    )
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    options = parser.parse_args(args)
+
+    params = {}
+    if options.curvature is not None:
+        params["curvature"] = options.curvature
+    if options.tension is not None:
+        params["tension"] = options.tension
+
+    from fontParts.fontshell import RFont
+
+    font = RFont(options.ufo)
+    flagged = scanFont(
+        font, options.method, options.threshold, workers=options.workers, **params
+    )
+    if options.top is not None:
+        flagged = flagged[: options.top]
+    for deviation, name, contourIndex, i in flagged:
+        print(f"{deviation:8.1f}  /{name} contour {contourIndex} segment {i}")
+    print(f"{len(flagged)} segments deviate more than {options.threshold} units.")
+    if options.mark:
+        writeChangedGlyphs(font, markFlaggedGlyphs(font, flagged))
+
+
+if __name__ == "__main__":
+    main()
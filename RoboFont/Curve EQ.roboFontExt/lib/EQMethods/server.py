@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import os
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from .batch import Handles, Segment, methodFunctions
+from .geometry import Point
+
+"""
+Local equalization server
+
+A long running process that listens on a Unix socket, so the method code is
+imported only once. Clients send batches of segments and get the new handle
+coordinates back.
+
+All values are little endian. A request is a header followed by the
+parameters and the segments as doubles:
+
+request id      uint32
+method id       uint8, the index in method_ids
+parameters      uint8, the number of parameter values
+reserved        uint16
+segments        uint32, the number of segments
+parameters      double each, in the order of method_parameters
+segments        8 doubles each: x0, y0, x1, y1, x2, y2, x3, y3
+
+The response is a header followed by the handles as doubles, or by an error
+message in UTF-8 if the status is not 0:
+
+request id      uint32
+status          uint8, 0 for success
+reserved        3 bytes
+count           uint32, the number of segments or the message length
+handles         4 doubles per segment: x1, y1, x2, y2
+
+A client may send more requests before reading the responses. They are
+answered in the order in which they were received. The server stops reading
+while the client doesn't read the responses, so a client should limit the
+number of requests in flight.
+
+Batches of executor_segments or more segments are equalized in an
+executor, a process pool unless one is passed in, so a large request doesn't
+hold up the other clients. Smaller batches are equalized on the event loop,
+sending them to another process would take longer than equalizing them.
+"""
+
+method_ids = list(methodFunctions)
+
+# Parameters of the methods in the order in which they are sent
+method_parameters: Dict[str, Tuple[str, ...]] = {
+    "adjust": ("curvature",),
+    "free": ("curvature",),
+    "hobby": ("tension",),
+    "quadratic": ("tolerance",),
+    "auto": ("tension",),
+}
+
+request_header = struct.Struct("<IBBHI")
+response_header = struct.Struct("<IB3xI")
+
+status_ok = 0
+status_error = 1
+
+# Largest accepted batch
+max_segments = 1 << 20
+
+# Batches with at least this many segments are equalized in the executor
+executor_segments = 64
+
+
+def _toDoubles(data: bytes) -> array:
+    values = array("d")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _fromDoubles(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array("d", values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def packRequest(
+    requestId: int, method: str, segments: List[Segment], **params
+) -> bytes:
+    names = method_parameters.get(method, ())
+    unknown = set(params) - set(names)
+    if unknown:
+        raise ValueError(f"Unknown parameters for {method}: {sorted(unknown)}")
+
+    # Parameters can only be left out from the end
+    values = []
+    for name in names:
+        if name not in params:
+            break
+
+        values.append(params[name])
+    values = array("d", values)
+    for segment in segments:
+        for x, y in segment:
+            values.append(x)
+            values.append(y)
+    return request_header.pack(
+        requestId,
+        method_ids.index(method),
+        len(values) - 8 * len(segments),
+        0,
+        len(segments),
+    ) + _fromDoubles(values)
+
+
+def equalizeRequest(methodId: int, paramValues: array, coordinates: array) -> array:
+    if methodId >= len(method_ids):
+        raise ValueError(f"Unknown method id: {methodId}")
+
+    method = method_ids[methodId]
+    names = method_parameters.get(method, ())
+    if len(paramValues) > len(names):
+        raise ValueError(f"Too many parameters for {method}")
+
+    params = dict(zip(names, paramValues))
+    func = methodFunctions[method]
+    handles = array("d")
+    for o in range(0, len(coordinates), 8):
+        x0, y0, x1, y1, x2, y2, x3, y3 = coordinates[o : o + 8]
+        p1, p2 = func(
+            Point(x0, y0), Point(x1, y1), Point(x2, y2), Point(x3, y3), **params
+        )
+        handles.extend((p1.x, p1.y, p2.x, p2.y))
+    return handles
+
+
+async def handleConnection(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, executor: Executor
+) -> None:
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                header = await reader.readexactly(request_header.size)
+            except asyncio.IncompleteReadError:
+                break
+
+            requestId, methodId, paramCount, _, count = request_header.unpack(header)
+            if count > max_segments:
+                # The rest of the stream can't be trusted
+                message = f"Too many segments: {count}".encode("utf-8")
+                writer.write(
+                    response_header.pack(requestId, status_error, len(message))
+                    + message
+                )
+                break
+
+            data = await reader.readexactly((paramCount + 8 * count) * 8)
+            values = _toDoubles(data)
+            try:
+                if count < executor_segments:
+                    handles = equalizeRequest(
+                        methodId, values[:paramCount], values[paramCount:]
+                    )
+                else:
+                    handles = await loop.run_in_executor(
+                        executor,
+                        equalizeRequest,
+                        methodId,
+                        values[:paramCount],
+                        values[paramCount:],
+                    )
+            except Exception as e:
+                message = str(e).encode("utf-8")
+                writer.write(
+                    response_header.pack(requestId, status_error, len(message))
+                    + message
+                )
+            else:
+                writer.write(
+                    response_header.pack(requestId, status_ok, count)
+                    + _fromDoubles(handles)
+                )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(path: str, executor: Executor | None = None) -> None:
+    if os.path.exists(path):
+        os.unlink(path)
+    ownExecutor = executor is None
+    if ownExecutor:
+        executor = ProcessPoolExecutor()
+    server = await asyncio.start_unix_server(
+        functools.partial(handleConnection, executor=executor), path
+    )
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+        if ownExecutor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class EqualizerClient:
+    def __init__(self, path: str) -> None:
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(path)
+        self.file = self.socket.makefile("rb")
+        self.nextId = 0
+
+    def __enter__(self) -> EqualizerClient:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.file.close()
+        self.socket.close()
+
+    def send(self, method: str, segments: List[Segment], **params) -> int:
+        # Send a request without waiting for the response, return its id
+        requestId = self.nextId
+        self.nextId = (self.nextId + 1) & 0xFFFFFFFF
+        self.socket.sendall(packRequest(requestId, method, segments, **params))
+        return requestId
+
+    def receive(self) -> Tuple[int, List[Handles]]:
+        # Read the next response, return the request id and the handles
+        header = self.file.read(response_header.size)
+        if len(header) < response_header.size:
+            raise ConnectionError("The server closed the connection")
+
+        requestId, status, count = response_header.unpack(header)
+        if status != status_ok:
+            raise ValueError(self.file.read(count).decode("utf-8"))
+
+        values = _toDoubles(self.file.read(count * 4 * 8))
+        return requestId, [tuple(values[k : k + 4]) for k in range(0, len(values), 4)]
+
+    def equalize(self, method: str, segments: List[Segment], **params) -> List[Handles]:
+        self.send(method, segments, **params)
+        return self.receive()[1]
+
+
+def benchmark(
+    path: str, segments: int = 16, requests: int = 2000, depth: int = 1
+) -> Dict[str, float]:
+    # Round trip times of requests with the given number of segments, with up
+    # to depth requests in flight
+    batch = [
+        ((0, 0), (30 + k % 7, 0), (100, 70 - k % 5), (100, 100))
+        for k in range(segments)
+    ]
+    latencies = []
+    sent = {}
+    with EqualizerClient(path) as client:
+        start = time.perf_counter()
+        for _ in range(requests):
+            if len(sent) >= depth:
+                requestId, _ = client.receive()
+                latencies.append(time.perf_counter() - sent.pop(requestId))
+            sent[client.send("balance", batch)] = time.perf_counter()
+        while sent:
+            requestId, _ = client.receive()
+            latencies.append(time.perf_counter() - sent.pop(requestId))
+        total = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p99": latencies[int(len(latencies) * 0.99)] * 1000,
+        "max": latencies[-1] * 1000,
+        "requestsPerSecond": requests / total,
+        "segmentsPerSecond": requests * segments / total,
+    }
+
+
+def main(args: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Local equalization server.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serveParser = commands.add_parser("serve", help="Run the server")
+    serveParser.add_argument("socket", help="Path of the Unix socket")
+    serveParser.add_argument(
+        "-j", "--workers", type=int, default=None, help="Default: the CPU count"
+    )
+    bench = commands.add_parser(
+        "bench", help="Measure the request latency over a loopback socket"
+    )
+    bench.add_argument(
+        "socket", nargs="?", help="Path of a running server. Default: start one"
+    )
+    bench.add_argument("-s", "--segments", type=int, default=16)
+    bench.add_argument("-n", "--requests", type=int, default=2000)
+    bench.add_argument(
+        "-d",
+        "--depth",
+        type=int,
+        action="append",
+        default=None,
+        help="Requests in flight, can be given more than once. Default: 1 and 8",
+    )
+    options = parser.parse_args(args)
+
+    if options.command == "serve":
+        with ProcessPoolExecutor(options.workers) as executor:
+            try:
+                asyncio.run(serve(options.socket, executor))
+            except KeyboardInterrupt:
+                pass
+        return
+
+    path = options.socket
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "curveeq.sock")
+        thread = threading.Thread(target=asyncio.run, args=(serve(path),), daemon=True)
+        thread.start()
+        while not os.path.exists(path):
+            time.sleep(0.01)
+    for depth in options.depth or [1, 8]:
+        result = benchmark(path, options.segments, options.requests, depth)
+        print(
+            f"depth {depth}: p50 {result['p50']:0.3f} ms, "
+            f"p99 {result['p99']:0.3f} ms, max {result['max']:0.3f} ms, "
+            f"{result['requestsPerSecond']:0.0f} requests/s, "
+            f"{result['segmentsPerSecond']:0.0f} segments/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import argparse
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from os import cpu_count
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+from .batch import Handles, Segment, getMethodFunction
+from .geometry import Point
+from .headless import getCurveSegments, movePoint, writeChangedGlyphs
+
+if TYPE_CHECKING:
+    from fontParts.fontshell import RFont
+
+"""
+Equalize a large number of segments in one shared memory buffer
+
+All segments are packed into one flat array of doubles in shared memory,
+eight values (x0, y0, x1, y1, x2, y2, x3, y3) per segment. Each worker
+process attaches to the buffer once, and each job only sends the start and
+stop index of a slice. The worker equalizes the segments of the slice and
+writes the new handles over the old ones in place, so no coordinates are
+pickled in either direction.
+
+The buffer is split into more slices than there are workers, so a worker
+that finishes early picks up the next slice.
+"""
+
+# Values per segment in the buffer
+stride = 8
+
+# Slices per worker
+slices_per_worker = 4
+
+SegmentKey = Tuple[str, str, int, int]
+
+# The buffer in a worker process
+_shm: shared_memory.SharedMemory | None = None
+
+
+def _attach(name: str) -> None:
+    global _shm
+    _shm = shared_memory.SharedMemory(name=name)
+
+
+def _equalizeSlice(start: int, stop: int, method: str, params: Dict[str, Any]) -> int:
+    func = getMethodFunction(method)
+    # The view is released after each task, otherwise the buffer can't be
+    # closed when the worker exits
+    values = _shm.buf.cast("d")
+    try:
+        for k in range(start, stop):
+            o = k * stride
+            x0, y0, x1, y1, x2, y2, x3, y3 = values[o : o + stride]
+            p1, p2 = func(
+                Point(x0, y0), Point(x1, y1), Point(x2, y2), Point(x3, y3), **params
+            )
+            values[o + 2] = p1.x
+            values[o + 3] = p1.y
+            values[o + 4] = p2.x
+            values[o + 5] = p2.y
+    finally:
+        values.release()
+    return stop - start
+
+
+def getSlices(count: int, slices: int) -> List[Tuple[int, int]]:
+    size = -(-count // slices)
+    return [(start, min(start + size, count)) for start in range(0, count, size)]
+
+
+def equalizePacked(
+    packed: array, method: str, workers: int | None = None, **params
+) -> array:
+    # Equalize the segments packed as stride doubles each, return the packed
+    # segments with the new handles
+    getMethodFunction(method)
+    count = len(packed) // stride
+    if count == 0:
+        return array("d")
+
+    if workers is None:
+        workers = cpu_count() or 1
+    shm = shared_memory.SharedMemory(create=True, size=len(packed) * 8)
+    try:
+        values = shm.buf.cast("d")
+        try:
+            values[: len(packed)] = packed
+            with ProcessPoolExecutor(
+                workers, initializer=_attach, initargs=(shm.name,)
+            ) as executor:
+                futures = [
+                    executor.submit(_equalizeSlice, start, stop, method, params)
+                    for start, stop in getSlices(count, workers * slices_per_worker)
+                ]
+                for future in futures:
+                    future.result()
+            return array("d", values[: len(packed)])
+
+        finally:
+            values.release()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def equalizeSegmentsShared(
+    segments: List[Segment], method: str, workers: int | None = None, **params
+) -> List[Handles]:
+    packed = array("d")
+    for segment in segments:
+        for x, y in segment:
+            packed.append(x)
+            packed.append(y)
+    packed = equalizePacked(packed, method, workers, **params)
+    return [
+        tuple(packed[k * stride + 2 : k * stride + 6]) for k in range(len(segments))
+    ]
+
+
+def equalizeFontShared(
+    font: RFont,
+    method: str = "balance",
+    layerNames: List[str] | None = None,
+    workers: int | None = None,
+    **params,
+) -> Dict[str, List[str]]:
+    # Equalize all curve segments of all layers. Return the names of the
+    # changed glyphs per layer.
+    if layerNames is None:
+        layerNames = font.layerOrder
+    keys: List[SegmentKey] = []
+    packed = array("d")
+    for layerName in layerNames:
+        layer = font.getLayer(layerName)
+        for name in layer.keys():
+            for contourIndex, i, segment in getCurveSegments(layer[name]):
+                keys.append((layerName, name, contourIndex, i))
+                for x, y in segment:
+                    packed.append(x)
+                    packed.append(y)
+
+    packed = equalizePacked(packed, method, workers, **params)
+
+    changed: Dict[str, List[str]] = {}
+    current = None
+    for k, (layerName, name, contourIndex, i) in enumerate(keys):
+        if (layerName, name) != current:
+            # The keys of a glyph are consecutive, get its segments once
+            current = layerName, name
+            glyphSegments = [
+                contour.segments for contour in font.getLayer(layerName)[name]
+            ]
+        x1, y1, x2, y2 = packed[k * stride + 2 : k * stride + 6]
+        p1, p2, _ = glyphSegments[contourIndex][i].points
+        moved1 = movePoint(p1, x1, y1)
+        moved2 = movePoint(p2, x2, y2)
+        if moved1 or moved2:
+            names = changed.setdefault(layerName, [])
+            if not names or names[-1] != name:
+                names.append(name)
+    return changed
+
+
+def main(args: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Equalize the curves of all layers of a UFO in a shared "
+        "memory buffer."
+    )
+    parser.add_argument("ufo", help="Path to the UFO")
+    parser.add_argument("-m", "--method", default="balance")
+    parser.add_argument("--curvature", type=float, default=None)
+    parser.add_argument("--tension", type=float, default=None)
+    parser.add_argument(
+        "--layer",
+        action="append",
+        default=None,
+        help="Layer to equalize, can be given more than once. Default: all",
+    )
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    options = parser.parse_args(args)
+
+    params = {}
+    if options.curvature is not None:
+        params["curvature"] = options.curvature
+    if options.tension is not None:
+        params["tension"] = options.tension
+
+    from fontParts.fontshell import RFont
+
+    font = RFont(options.ufo)
+    changed = equalizeFontShared(
+        font, options.method, options.layer, options.workers, **params
+    )
+    for layerName, glyphNames in changed.items():
+        writeChangedGlyphs(font, glyphNames, layerName)
+        print(f"{layerName}: equalized {len(glyphNames)} glyphs.")
+    print(f"Changed {sum(len(names) for names in changed.values())} glyphs.")
+
+
+if __name__ == "__main__":
+    main()
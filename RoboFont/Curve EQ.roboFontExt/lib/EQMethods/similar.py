@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import argparse
+from math import atan2, floor, pi, sqrt
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from .batch import Segment
+from .geometry import (
+    Point,
+    distance,
+    getNewCoordinates,
+    getTriangleAngles,
+    getTriangleSides,
+    isOnLeft,
+    isOnRight,
+)
+from .headless import getCurveSegments, movePoint, writeChangedGlyphs
+
+if TYPE_CHECKING:
+    from fontParts.fontshell import RFont
+
+"""
+Find similar curve segments and harmonize their handles
+
+The shape signature of a segment is made of the two triangle angles at its
+on-curve points (see getTriangleAngles) and its chord length relative to the
+units per em. Segments that eqPercentage would leave alone have no
+signature.
+
+All segments of a font are put into a grid of signature cells, so the
+segments near a reference segment are found by looking at the neighboring
+cells only. The handle percentages of the triangle sides of the reference
+segment are then applied to them, with the same construction as
+eqPercentage. A segment that runs in the opposite direction of the reference
+matches with its angles swapped, and gets the percentages swapped.
+"""
+
+Signature = Tuple[float, float, float]
+SegmentKey = Tuple[str, int, int]
+
+
+def normalizeAngle(angle: float) -> float:
+    # Absolute angle in the range 0 to pi
+    return abs((angle + pi) % (2 * pi) - pi)
+
+
+def getTriangle(segment: Segment) -> Tuple[Point, ...] | None:
+    # The points of the segment if eqPercentage would change it
+    p0, p1, p2, p3 = [Point(x, y) for x, y in segment]
+    if (p0.x, p0.y) == (p1.x, p1.y) or (p3.x, p3.y) == (p2.x, p2.y):
+        return None
+
+    alpha = atan2(p1.y - p0.y, p1.x - p0.x)
+    beta = atan2(p2.y - p3.y, p2.x - p3.x)
+    if abs(alpha - beta) < 0.7853981633974483:  # 45°
+        return None
+
+    if not (
+        isOnLeft(p0, p3, p1)
+        and isOnLeft(p0, p3, p2)
+        or isOnRight(p0, p3, p1)
+        and isOnRight(p0, p3, p2)
+    ):
+        return None
+
+    return p0, p1, p2, p3
+
+
+def getSegmentSignature(
+    segment: Segment, unitsPerEm: float = 1000, chordWeight: float = 1.0
+) -> Signature | None:
+    points = getTriangle(segment)
+    if points is None:
+        return None
+
+    alpha, _, gamma = getTriangleAngles(*points)
+    chord = distance(points[0], points[3]) / unitsPerEm
+    return normalizeAngle(alpha), normalizeAngle(gamma), chord * chordWeight
+
+
+def getHandlePercentages(segment: Segment) -> Tuple[float, float] | None:
+    # Handle lengths relative to their triangle sides: p0-p1 of c, p3-p2 of a
+    points = getTriangle(segment)
+    if points is None:
+        return None
+
+    p0, p1, p2, p3 = points
+    a, b, c = getTriangleSides(p0, p1, p2, p3)
+    if a <= 0 or c <= 0:
+        return None
+
+    return distance(p0, p1) / c, distance(p3, p2) / a
+
+
+def applyHandlePercentages(
+    segment: Segment, percentages: Tuple[float, float]
+) -> Tuple[float, float, float, float] | None:
+    # Return the new handles (x1, y1, x2, y2)
+    points = getTriangle(segment)
+    if points is None:
+        return None
+
+    p0, p1, p2, p3 = points
+    a, b, c = getTriangleSides(p0, p1, p2, p3)
+    x1, y1 = getNewCoordinates(p1, p0, p2, c * percentages[0])
+    x2, y2 = getNewCoordinates(p2, p3, p1, a * percentages[1])
+    return x1, y1, x2, y2
+
+
+class SegmentIndex:
+    def __init__(self, cellSize: float = 0.1) -> None:
+        self.cellSize = cellSize
+        self.cells: Dict[Tuple[int, int, int], list] = {}
+        self.size = 0
+
+    def getCell(self, signature: Signature) -> Tuple[int, int, int]:
+        return tuple(floor(v / self.cellSize) for v in signature)
+
+    def add(self, key: SegmentKey, signature: Signature) -> None:
+        self.cells.setdefault(self.getCell(signature), []).append((signature, key))
+        self.size += 1
+
+    def query(
+        self, signature: Signature, radius: float
+    ) -> List[Tuple[float, SegmentKey]]:
+        # Return (distance, key) of the segments within the radius, nearest
+        # first
+        reach = int(radius // self.cellSize) + 1
+        ci, cj, ck = self.getCell(signature)
+        found = []
+        for i in range(ci - reach, ci + reach + 1):
+            for j in range(cj - reach, cj + reach + 1):
+                for k in range(ck - reach, ck + reach + 1):
+                    for other, key in self.cells.get((i, j, k), ()):
+                        d = sqrt(sum((u - v) ** 2 for u, v in zip(signature, other)))
+                        if d <= radius:
+                            found.append((d, key))
+        found.sort()
+        return found
+
+    @classmethod
+    def fromFont(
+        cls,
+        font: RFont,
+        glyphNames: List[str] | None = None,
+        cellSize: float = 0.1,
+        chordWeight: float = 1.0,
+    ) -> SegmentIndex:
+        index = cls(cellSize)
+        unitsPerEm = font.info.unitsPerEm or 1000
+        if glyphNames is None:
+            glyphNames = font.glyphOrder
+        for name in glyphNames:
+            if name not in font:
+                continue
+
+            for contourIndex, i, segment in getCurveSegments(font[name]):
+                signature = getSegmentSignature(segment, unitsPerEm, chordWeight)
+                if signature is not None:
+                    index.add((name, contourIndex, i), signature)
+        return index
+
+
+def getSegment(font: RFont, key: SegmentKey) -> Segment:
+    name, contourIndex, i = key
+    contour = font[name][contourIndex]
+    p0 = contour[i - 1][-1]
+    return tuple((p.x, p.y) for p in (p0, *contour[i].points))
+
+
+def findSimilarSegments(
+    font: RFont,
+    reference: SegmentKey,
+    radius: float = 0.1,
+    index: SegmentIndex | None = None,
+    chordWeight: float = 1.0,
+) -> Dict[SegmentKey, Tuple[float, Tuple[float, float]]]:
+    # Return the distance and the handle percentages to apply for each
+    # segment similar to the reference segment
+    if index is None:
+        index = SegmentIndex.fromFont(font, chordWeight=chordWeight)
+    unitsPerEm = font.info.unitsPerEm or 1000
+    segment = getSegment(font, reference)
+    signature = getSegmentSignature(segment, unitsPerEm, chordWeight)
+    percentages = getHandlePercentages(segment)
+    if signature is None or percentages is None:
+        raise ValueError(f"Reference segment {reference} has no triangle")
+
+    alpha, gamma, chord = signature
+    matches = {}
+    # Segments in the same and in the opposite direction
+    for sig, pct in (
+        (signature, percentages),
+        ((gamma, alpha, chord), (percentages[1], percentages[0])),
+    ):
+        for d, key in index.query(sig, radius):
+            if key != reference and (key not in matches or d < matches[key][0]):
+                matches[key] = d, pct
+    return matches
+
+
+def harmonizeSimilarSegments(
+    font: RFont,
+    reference: SegmentKey,
+    radius: float = 0.1,
+    index: SegmentIndex | None = None,
+    chordWeight: float = 1.0,
+) -> Dict[str, int]:
+    # Apply the handle percentages of the reference segment to all similar
+    # segments. Return the number of changed segments per glyph.
+    matches = findSimilarSegments(font, reference, radius, index, chordWeight)
+    changed = {}
+    for key, (_, pct) in matches.items():
+        name, contourIndex, i = key
+        handles = applyHandlePercentages(getSegment(font, key), pct)
+        if handles is None:
+            continue
+
+        x1, y1, x2, y2 = handles
+        p1, p2, _ = font[name][contourIndex][i].points
+        moved1 = movePoint(p1, x1, y1)
+        moved2 = movePoint(p2, x2, y2)
+        if moved1 or moved2:
+            changed[name] = changed.get(name, 0) + 1
+    return changed
+
+
+def main(args: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Apply the handle percentages of a reference curve segment "
+        "to all similar segments of a UFO."
+    )
+    parser.add_argument("ufo", help="Path to the UFO")
+    parser.add_argument("glyph", help="Name of the reference glyph")
+    parser.add_argument("contour", type=int, help="Index of the reference contour")
+    parser.add_argument("segment", type=int, help="Index of the reference segment")
+    parser.add_argument(
+        "-r",
+        "--radius",
+        type=float,
+        default=0.1,
+        help="Maximum signature distance (angles in radians, chord in em)",
+    )
+    parser.add_argument(
+        "--chord-weight",
+        type=float,
+        default=1.0,
+        help="Weight of the chord length in the signature",
+    )
+    parser.add_argument(
+        "-n", "--dry-run", action="store_true", help="Only list the similar segments"
+    )
+    options = parser.parse_args(args)
+
+    from fontParts.fontshell import RFont
+
+    font = RFont(options.ufo)
+    reference = (options.glyph, options.contour, options.segment)
+    if options.dry_run:
+        matches = findSimilarSegments(
+            font, reference, options.radius, chordWeight=options.chord_weight
+        )
+        for (name, contourIndex, i), (d, _) in sorted(
+            matches.items(), key=lambda item: item[1][0]
+        ):
+            print(f"/{name} contour {contourIndex} segment {i}: {d:0.3f}")
+        return
+
+    changed = harmonizeSimilarSegments(
+        font, reference, options.radius, chordWeight=options.chord_weight
+    )
+    for name, count in sorted(changed.items()):
+        print(f"/{name}: {count} segments changed")
+    writeChangedGlyphs(font, sorted(changed))
+    print(f"Harmonized {sum(changed.values())} segments in {len(changed)} glyphs.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+from array import array
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List
+
+from .batch import Segment, getMethodFunction
+from .geometry import Point
+from .headless import getGlyphSet, movePoint, unloadGlyph
+
+if TYPE_CHECKING:
+    from fontParts.fontshell import RFont, RGlyph
+
+"""
+Columnar on-disk store of the point coordinates of a font
+
+The points of all glyphs of a layer are extracted once into flat binary
+columns, which are memory mapped when the store is opened:
+
+x.f64, y.f64            coordinates of all points
+types.u8                point type codes, see point_types
+contours.u32            index of the first point of each contour, and the
+                        total number of points at the end
+glyphs.u32              index of the first contour of each glyph, and the
+                        total number of contours at the end
+segments.u32            indices of the four points of each cubic curve
+                        segment
+glyphsegments.u32       index of the first segment of each glyph, and the
+                        total number of segments at the end
+handles.f64             x1, y1, x2, y2 of each segment after equalizing
+store.json              glyph names, layer name and path of the UFO
+
+The methods run chunk by chunk over the segments and write to the handles
+column, so the memory use does not grow with the font, and the UFO is not
+parsed again for each run. A final pass writes the handles back to the .glif
+files of the UFO, except to glyphs whose points differ from the extracted
+ones. Both passes load one glyph at a time.
+"""
+
+point_types = ["move", "line", "curve", "qcurve", "offcurve"]
+
+# Segments per chunk
+chunk_size = 65536
+
+columns = {
+    "x": "d",
+    "y": "d",
+    "types": "B",
+    "contours": "I",
+    "glyphs": "I",
+    "segments": "I",
+    "glyphsegments": "I",
+    "handles": "d",
+}
+
+suffixes = {"d": "f64", "B": "u8", "I": "u32"}
+
+
+def getColumnPath(path: Path, column: str) -> Path:
+    return path / f"{column}.{suffixes[columns[column]]}"
+
+
+def extractStore(font: RFont, path: str, layerName: str | None = None) -> None:
+    # Write the points of a layer to a new store, one glyph at a time
+    if array("I").itemsize != 4:
+        raise RuntimeError("The store needs 4 byte unsigned integers")
+
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    if layerName is None:
+        layerName = font.defaultLayerName
+    layer = font.getLayer(layerName)
+    glyphNames = [name for name in font.glyphOrder if name in layer]
+    glyphNames += sorted(set(layer.keys()) - set(glyphNames))
+
+    files = {
+        column: open(getColumnPath(path, column), "wb")
+        for column in columns
+        if column != "handles"
+    }
+    pointCount = 0
+    contourCount = 0
+    segmentCount = 0
+    try:
+        for name in glyphNames:
+            xs = array("d")
+            ys = array("d")
+            types = array("B")
+            contours = array("I")
+            segments = array("I")
+            array("I", [contourCount]).tofile(files["glyphs"])
+            array("I", [segmentCount]).tofile(files["glyphsegments"])
+            for contour in layer[name]:
+                start = pointCount + len(xs)
+                contours.append(start)
+                points = contour.points
+                n = len(points)
+                for p in points:
+                    xs.append(p.x)
+                    ys.append(p.y)
+                    types.append(point_types.index(p.type))
+                closed = points[0].type != "move"
+                for j, p in enumerate(points):
+                    if p.type != "curve" or j < 3 and not closed:
+                        continue
+
+                    if (
+                        points[j - 1].type == "offcurve"
+                        and points[j - 2].type == "offcurve"
+                        and points[j - 3].type != "offcurve"
+                    ):
+                        for k in (j - 3, j - 2, j - 1, j):
+                            segments.append(start + k % n)
+            xs.tofile(files["x"])
+            ys.tofile(files["y"])
+            types.tofile(files["types"])
+            contours.tofile(files["contours"])
+            segments.tofile(files["segments"])
+            # Don't keep all glyphs of a large font loaded
+            unloadGlyph(layer, name)
+            pointCount += len(xs)
+            contourCount += len(contours)
+            segmentCount += len(segments) // 4
+        array("I", [pointCount]).tofile(files["contours"])
+        array("I", [contourCount]).tofile(files["glyphs"])
+        array("I", [segmentCount]).tofile(files["glyphsegments"])
+    finally:
+        for f in files.values():
+            f.close()
+
+    with open(getColumnPath(path, "handles"), "wb") as f:
+        f.truncate(segmentCount * 4 * 8)
+    with open(path / "store.json", "w", encoding="utf-8") as f:
+        json.dump({"ufo": font.path, "layer": layerName, "glyphs": glyphNames}, f)
+
+
+class CoordinateStore:
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        with open(self.path / "store.json", encoding="utf-8") as f:
+            info = json.load(f)
+        self.ufo = info["ufo"]
+        self.layerName = info["layer"]
+        self.glyphNames: List[str] = info["glyphs"]
+        self._files = {}
+        self._maps = {}
+        self._views: Dict[str, memoryview] = {}
+        for column, typecode in columns.items():
+            writable = column == "handles"
+            f = open(getColumnPath(self.path, column), "r+b" if writable else "rb")
+            self._files[column] = f
+            if f.seek(0, 2) == 0:
+                # Empty columns can't be mapped
+                self._views[column] = memoryview(array(typecode))
+                continue
+
+            m = mmap.mmap(
+                f.fileno(),
+                0,
+                access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ,
+            )
+            self._maps[column] = m
+            self._views[column] = memoryview(m).cast(typecode)
+
+    def __getattr__(self, column: str) -> memoryview:
+        try:
+            return self.__dict__["_views"][column]
+        except KeyError:
+            raise AttributeError(column) from None
+
+    def __enter__(self) -> CoordinateStore:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for view in self._views.values():
+            view.release()
+        for m in self._maps.values():
+            m.close()
+        for f in self._files.values():
+            f.close()
+        self._views = {}
+        self._maps = {}
+        self._files = {}
+
+    @property
+    def segmentCount(self) -> int:
+        return len(self.segments) // 4
+
+    def getSegments(self, start: int, stop: int) -> List[Segment]:
+        xs = self.x
+        ys = self.y
+        indices = self.segments[start * 4 : stop * 4]
+        return [
+            tuple((xs[i], ys[i]) for i in indices[k : k + 4])
+            for k in range(0, len(indices), 4)
+        ]
+
+    def equalize(
+        self, method: str = "balance", chunkSize: int = chunk_size, **params
+    ) -> None:
+        # Calculate the handles of all segments, one chunk at a time
+        func = getMethodFunction(method)
+        handles = self.handles
+        for start in range(0, self.segmentCount, chunkSize):
+            stop = min(start + chunkSize, self.segmentCount)
+            result = array("d")
+            for p0, p1, p2, p3 in self.getSegments(start, stop):
+                p1, p2 = func(Point(*p0), Point(*p1), Point(*p2), Point(*p3), **params)
+                result.extend((p1.x, p1.y, p2.x, p2.y))
+            handles[start * 4 : stop * 4] = result
+        if "handles" in self._maps:
+            # Without segments the column is empty and not mapped
+            self._maps["handles"].flush()
+
+    def matches(self, g: int, glyph: RGlyph) -> bool:
+        # Return True if the contours and points of the glyph are the ones
+        # extracted to the store
+        contourStart = self.glyphs[g]
+        contourStop = self.glyphs[g + 1]
+        if len(glyph) != contourStop - contourStart:
+            return False
+
+        xs = self.x
+        ys = self.y
+        types = self.types
+        for c, contour in enumerate(glyph, contourStart):
+            start = self.contours[c]
+            points = contour.points
+            if len(points) != self.contours[c + 1] - start:
+                return False
+
+            for i, p in enumerate(points, start):
+                if p.x != xs[i] or p.y != ys[i] or p.type != point_types[types[i]]:
+                    return False
+
+        return True
+
+    def writeBack(self, font: RFont) -> Dict[str, Any]:
+        # Move the handles of the font to the calculated positions and write
+        # the .glif files of the changed glyphs. Glyphs whose points don't
+        # match the store anymore are skipped.
+        layer = font.getLayer(self.layerName)
+        glyphSet = getGlyphSet(font, self.layerName)
+        changed = []
+        skipped = []
+        for g, name in enumerate(self.glyphNames):
+            first = self.glyphsegments[g]
+            last = self.glyphsegments[g + 1]
+            if first == last:
+                continue
+
+            glyph = layer[name] if name in layer else None
+            if glyph is None or not self.matches(g, glyph):
+                skipped.append(name)
+                if glyph is not None:
+                    unloadGlyph(layer, name)
+                continue
+
+            pointStart = self.contours[self.glyphs[g]]
+            points = [p for contour in glyph for p in contour.points]
+
+            moved = False
+            for k in range(first, last):
+                p1 = points[self.segments[k * 4 + 1] - pointStart]
+                p2 = points[self.segments[k * 4 + 2] - pointStart]
+                x1, y1, x2, y2 = self.handles[k * 4 : k * 4 + 4]
+                moved1 = movePoint(p1, x1, y1)
+                moved2 = movePoint(p2, x2, y2)
+                moved = moved or moved1 or moved2
+            if moved:
+                naked = glyph.naked()
+                glyphSet.writeGlyph(name, naked, drawPointsFunc=naked.drawPoints)
+                # The file is up to date now
+                naked.dirty = False
+                changed.append(name)
+            unloadGlyph(layer, name)
+        return {"changed": changed, "skipped": skipped}
+
+
+def main(args: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Extract the points of a UFO layer to a memory mapped "
+        "store, equalize them there and write the result back."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    extract = commands.add_parser("extract", help="Create a store from a UFO")
+    extract.add_argument("ufo", help="Path to the UFO")
+    extract.add_argument("store", help="Path of the store directory")
+    extract.add_argument("--layer", default=None, help="Default: the default layer")
+    equalize = commands.add_parser("equalize", help="Calculate the handles")
+    equalize.add_argument("store", help="Path of the store directory")
+    equalize.add_argument("-m", "--method", default="balance")
+    equalize.add_argument("--curvature", type=float, default=None)
+    equalize.add_argument("--tension", type=float, default=None)
+    write = commands.add_parser("write", help="Write the handles to the UFO")
+    write.add_argument("store", help="Path of the store directory")
+    write.add_argument("ufo", nargs="?", help="Default: the UFO of the store")
+    options = parser.parse_args(args)
+
+    from fontParts.fontshell import RFont
+
+    if options.command == "extract":
+        extractStore(RFont(options.ufo), options.store, options.layer)
+        with CoordinateStore(options.store) as store:
+            print(
+                f"Extracted {len(store.x)} points and {store.segmentCount} "
+                f"curve segments of {len(store.glyphNames)} glyphs."
+            )
+    elif options.command == "equalize":
+        params = {}
+        if options.curvature is not None:
+            params["curvature"] = options.curvature
+        if options.tension is not None:
+            params["tension"] = options.tension
+        with CoordinateStore(options.store) as store:
+            store.equalize(options.method, **params)
+            print(f"Equalized {store.segmentCount} curve segments.")
+    else:
+        with CoordinateStore(options.store) as store:
+            font = RFont(options.ufo or store.ufo)
+            result = store.writeBack(font)
+        print(f"Changed {len(result['changed'])} glyphs.")
+        if result["skipped"]:
+            print(
+                "Skipped glyphs that don't match the store:",
+                " ".join(f"/{name}" for name in result["skipped"]),
+            )
+
+
+if __name__ == "__main__":
+    main()
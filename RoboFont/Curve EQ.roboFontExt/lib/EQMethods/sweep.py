@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import List
+
+from .batch import Handles, Segment, equalizeSegments
+
+"""
+Precomputed parameter sweep
+
+When a selection is made, the new handle positions are computed for the
+whole parameter range of a method at once. Moving a slider then only
+interpolates between the two nearest precomputed parameter values, so its
+cost does not depend on the method.
+"""
+
+
+def getSweepValues(
+    minValue: float, maxValue: float, resolution: float = 0.01
+) -> List[float]:
+    # Parameter values from minValue to maxValue (inclusive) in steps of
+    # resolution
+    steps = max(1, round((maxValue - minValue) / resolution))
+    return [minValue + (maxValue - minValue) * i / steps for i in range(steps + 1)]
+
+
+class ParameterSweep:
+    def __init__(
+        self,
+        segments: List[Segment],
+        method: str,
+        parameter: str,
+        values: List[float],
+    ) -> None:
+        self.method = method
+        self.parameter = parameter
+        self.values = sorted(values)
+        self.table = [
+            equalizeSegments(segments, method, **{parameter: value})
+            for value in self.values
+        ]
+
+    def lookup(self, value: float) -> List[Handles]:
+        # Return the handles for value, interpolated between the nearest
+        # precomputed values
+        values = self.values
+        if value <= values[0]:
+            return self.table[0]
+
+        if value >= values[-1]:
+            return self.table[-1]
+
+        i = bisect_right(values, value)
+        v0 = values[i - 1]
+        v1 = values[i]
+        if v0 == value:
+            return self.table[i - 1]
+
+        f = (value - v0) / (v1 - v0)
+        return [
+            tuple(a + (b - a) * f for a, b in zip(h0, h1))
+            for h0, h1 in zip(self.table[i - 1], self.table[i])
+        ]
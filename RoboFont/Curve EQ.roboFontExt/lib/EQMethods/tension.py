@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import argparse
+import json
+from math import atan2
+from typing import TYPE_CHECKING, Any, Dict, List
+
+from .batch import Segment
+from .geometry import Point, distance, getTriangleSides, isOnLeft, isOnRight
+from .headless import getCurveSegments, movePoint, writeChangedGlyphs
+from .HobbySpline import arg, eqSpline, hobby
+from .Percentage import eqPercentage
+
+if TYPE_CHECKING:
+    from fontParts.fontshell import RFont
+
+"""
+Font-wide tension statistics and normalization
+
+Pass one measures each curve segment: its curvature ratio, which is the
+handle percentage of the triangle sides that eqPercentage would apply, and
+its Hobby tension, which is the tension that eqSpline would need to create
+the same handle lengths. The values are counted in histograms of a fixed
+size per glyph group, so the memory does not grow with the font.
+
+Pass two equalizes each segment to the median of its group, either with
+eqPercentage (the curvature ratio) or with eqSpline (the tension).
+
+The statistics of pass one can be written to a JSON file as a QA report.
+"""
+
+# Glyphs that are not in any of the given groups
+default_group = "default"
+
+
+class Histogram:
+    def __init__(self, minValue: float, maxValue: float, bins: int) -> None:
+        self.minValue = minValue
+        self.maxValue = maxValue
+        self.counts = [0] * bins
+        self.below = 0
+        self.above = 0
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value < self.minValue:
+            self.below += 1
+        elif value >= self.maxValue:
+            self.above += 1
+        else:
+            bins = len(self.counts)
+            i = int((value - self.minValue) / (self.maxValue - self.minValue) * bins)
+            self.counts[min(i, bins - 1)] += 1
+
+    @property
+    def mean(self) -> float | None:
+        if self.count == 0:
+            return None
+
+        return self.total / self.count
+
+    def percentile(self, p: float) -> float | None:
+        # Interpolated within the bin that contains the percentile
+        if self.count == 0:
+            return None
+
+        target = self.count * p / 100
+        seen = self.below
+        if target <= seen:
+            return self.minValue
+
+        width = (self.maxValue - self.minValue) / len(self.counts)
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= target:
+                return self.minValue + width * (i + (target - seen) / count)
+
+            seen += count
+        return self.maxValue
+
+    @property
+    def median(self) -> float | None:
+        return self.percentile(50)
+
+    def asDict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p10": self.percentile(10),
+            "median": self.median,
+            "p90": self.percentile(90),
+            "min": self.minValue,
+            "max": self.maxValue,
+            "below": self.below,
+            "above": self.above,
+            "bins": self.counts,
+        }
+
+
+class GroupStatistics:
+    def __init__(self) -> None:
+        self.glyphs = 0
+        self.curvature = Histogram(0.0, 1.5, 150)
+        self.tension = Histogram(0.0, 4.0, 400)
+
+    def asDict(self) -> Dict[str, Any]:
+        return {
+            "glyphs": self.glyphs,
+            "curvature": self.curvature.asDict(),
+            "tension": self.tension.asDict(),
+        }
+
+
+def getCurvatureRatio(segment: Segment) -> float | None:
+    # The curvature that eqPercentage would need to create the current
+    # handles, or None if eqPercentage would leave the segment alone
+    p0, p1, p2, p3 = [Point(x, y) for x, y in segment]
+    if (p0.x, p0.y) == (p1.x, p1.y) or (p3.x, p3.y) == (p2.x, p2.y):
+        return None
+
+    alpha = atan2(p1.y - p0.y, p1.x - p0.x)
+    beta = atan2(p2.y - p3.y, p2.x - p3.x)
+    if abs(alpha - beta) < 0.7853981633974483:  # 45°
+        return None
+
+    if not (
+        isOnLeft(p0, p3, p1)
+        and isOnLeft(p0, p3, p2)
+        or isOnRight(p0, p3, p1)
+        and isOnRight(p0, p3, p2)
+    ):
+        return None
+
+    a, b, c = getTriangleSides(p0, p1, p2, p3)
+    if a <= 0 or c <= 0:
+        return None
+
+    return (distance(p0, p1) / c + distance(p3, p2) / a) / 2
+
+
+def getHobbyTension(segment: Segment) -> float | None:
+    # The tension that eqSpline would need to create the current handles
+    (x0, y0), (x1, y1), (x2, y2), (x3, y3) = segment
+    z0 = complex(x0, y0)
+    z1 = complex(x3, y3)
+    d0 = complex(x1, y1) - z0
+    d1 = z1 - complex(x2, y2)
+    if d0 == 0 or d1 == 0 or z1 == z0:
+        return None
+
+    w0 = d0 / abs(d0)
+    w1 = d1 / abs(d1)
+    theta = arg(w0 / (z1 - z0))
+    phi = arg((z1 - z0) / w1)
+    alpha = abs(z1 - z0) * abs(hobby(theta, phi)) / abs(d0)
+    beta = abs(z1 - z0) * abs(hobby(phi, theta)) / abs(d1)
+    return (alpha + beta) / 2
+
+
+def getGlyphGroups(font: RFont, groupPrefix: str | None = None) -> Dict[str, str]:
+    # Map glyph names to the font groups that start with the prefix
+    glyphGroups = {}
+    if groupPrefix is not None:
+        for groupName, glyphNames in font.groups.items():
+            if groupName.startswith(groupPrefix):
+                for name in glyphNames:
+                    glyphGroups.setdefault(name, groupName)
+    return glyphGroups
+
+
+def collectTensionStatistics(
+    font: RFont,
+    glyphNames: List[str] | None = None,
+    glyphGroups: Dict[str, str] | None = None,
+) -> Dict[str, GroupStatistics]:
+    # Pass one
+    if glyphNames is None:
+        glyphNames = font.glyphOrder
+    if glyphGroups is None:
+        glyphGroups = {}
+    statistics = {}
+    for name in glyphNames:
+        if name not in font:
+            continue
+
+        segments = getCurveSegments(font[name])
+        if not segments:
+            continue
+
+        group = glyphGroups.get(name, default_group)
+        if group not in statistics:
+            statistics[group] = GroupStatistics()
+        stats = statistics[group]
+        stats.glyphs += 1
+        for _, _, segment in segments:
+            ratio = getCurvatureRatio(segment)
+            if ratio is not None:
+                stats.curvature.add(ratio)
+            tension = getHobbyTension(segment)
+            if tension is not None:
+                stats.tension.add(tension)
+    return statistics
+
+
+def normalizeToMedian(
+    font: RFont,
+    statistics: Dict[str, GroupStatistics],
+    method: str = "adjust",
+    glyphNames: List[str] | None = None,
+    glyphGroups: Dict[str, str] | None = None,
+) -> List[str]:
+    # Pass two. method is "adjust" for eqPercentage or "hobby" for eqSpline.
+    # Return the names of the changed glyphs.
+    if method not in ("adjust", "hobby"):
+        raise ValueError(f"Unknown normalize method: {method}")
+
+    if glyphNames is None:
+        glyphNames = font.glyphOrder
+    if glyphGroups is None:
+        glyphGroups = {}
+    changed = []
+    for name in glyphNames:
+        if name not in font:
+            continue
+
+        stats = statistics.get(glyphGroups.get(name, default_group))
+        if stats is None:
+            continue
+
+        if method == "adjust":
+            median = stats.curvature.median
+        else:
+            median = stats.tension.median
+        if median is None:
+            continue
+
+        glyph = font[name]
+        glyph_changed = False
+        for contourIndex, i, segment in getCurveSegments(glyph):
+            p0, p1, p2, p3 = [Point(x, y) for x, y in segment]
+            if method == "adjust":
+                p1, p2 = eqPercentage(p0, p1, p2, p3, median)
+            else:
+                p1, p2 = eqSpline(p0, p1, p2, p3, median)
+            q1, q2, _ = glyph[contourIndex][i].points
+            moved1 = movePoint(q1, p1.x, p1.y)
+            moved2 = movePoint(q2, p2.x, p2.y)
+            if moved1 or moved2:
+                glyph_changed = True
+        if glyph_changed:
+            changed.append(name)
+    return changed
+
+
+def writeTensionReport(statistics: Dict[str, GroupStatistics], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {group: stats.asDict() for group, stats in sorted(statistics.items())},
+            f,
+            indent=2,
+        )
+
+
+def main(args: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Report the curve tension of a UFO and normalize it to the "
+        "median of each glyph group."
+    )
+    parser.add_argument("ufo", help="Path to the UFO")
+    parser.add_argument("--report", help="Path of the JSON report to write")
+    parser.add_argument(
+        "--groups",
+        metavar="PREFIX",
+        default=None,
+        help="Use the font groups starting with this prefix as glyph groups, "
+        "otherwise all glyphs are in one group",
+    )
+    parser.add_argument(
+        "--normalize",
+        choices=("adjust", "hobby"),
+        default=None,
+        help="Equalize each segment to the group median with eqPercentage "
+        "(adjust) or eqSpline (hobby)",
+    )
+    options = parser.parse_args(args)
+
+    from fontParts.fontshell import RFont
+
+    font = RFont(options.ufo)
+    glyphGroups = getGlyphGroups(font, options.groups)
+    statistics = collectTensionStatistics(font, glyphGroups=glyphGroups)
+    for group, stats in sorted(statistics.items()):
+        curvature = stats.curvature.median
+        tension = stats.tension.median
+        print(
+            f"{group}: {stats.glyphs} glyphs, "
+            f"{stats.curvature.count} segments, median curvature "
+            f"{'-' if curvature is None else round(curvature, 3)}, median "
+            f"tension {'-' if tension is None else round(tension, 3)}"
+        )
+    if options.report:
+        writeTensionReport(statistics, options.report)
+
+    if options.normalize:
+        changed = normalizeToMedian(
+            font, statistics, options.normalize, glyphGroups=glyphGroups
+        )
+        writeChangedGlyphs(font, changed)
+        print(f"Normalized {len(changed)} glyphs.")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,30 @@ from math import atan2
 from typing import TYPE_CHECKING, List
 
 from baseCurveEqualizer import BaseCurveEqualizer
-from EQDrawingHelpers import appendCurveSegment, appendHandle, appendTriangleSide
+from EQDrawingHelpers import (
+    appendCurveSegment,
+    appendHandle,
+    appendQCurveSegment,
+    appendTriangleSide,
+)
 from EQExtensionID import extensionID
-from EQMethods import eqBalance, eqPercentage, eqSpline, eqThirds
+from EQMethods import (
+    eqArc,
+    eqArcLength,
+    eqArea,
+    eqBalance,
+    eqG2,
+    eqPercentage,
+    eqQuadratic,
+    eqSpline,
+    eqThirds,
+)
+from EQMethods.Auto import chooseMethod
+from EQMethods.G2 import getChains
 from EQMethods.geometry import getTriangleSides, isOnLeft, isOnRight
+from EQMethods.merge import mergeGlyphSegments
+from EQMethods.qcurve import eqQCurve
+from EQMethods.sweep import ParameterSweep, getSweepValues
 from lib.tools.defaults import getDefault, getDefaultColor
 from lib.tools.misc import NSColorToRgba
 from mojo.extensions import getExtensionDefault, setExtensionDefault
@@ -153,6 +173,7 @@ class CurveEqSubscriber(Subscriber):
             return
 
         self.controller.tmp_glyph = self.controller._dglyph.copy()
+        self.controller.sweep = None
         self.controller.updateCurvePreview()
 
     def glyphDidChangeSelection(self, info) -> None:
@@ -218,6 +239,28 @@ class CurveEqualizer(BaseCurveEqualizer, WindowController):
 
         self._setPreviewOptions()
 
+        # Segments closer than this to a quadratic are left alone by the
+        # TrueType method
+        self.quadraticTolerance = getExtensionDefault(
+            f"{extensionID}.quadraticTolerance", 0.0
+        )
+
+        # Weights of the measures the Auto method uses to pick a result,
+        # None for equal weights
+        self.autoObjective = getExtensionDefault(f"{extensionID}.autoObjective", None)
+
+        # Key of the method the Auto method used for the last segment
+        self.autoWinner = None
+
+        # Merge pairs of selected curve segments after equalizing if they
+        # deviate less than this from a single curve, 0 to disable
+        self.mergeTolerance = getExtensionDefault(f"{extensionID}.mergeTolerance", 0)
+
+        # Step width of the precomputed parameter sweep for the sliders
+        self.sweepResolution = getExtensionDefault(
+            f"{extensionID}.sweepResolution", 0.01
+        )
+
         self.drawGeometry = getExtensionDefault(f"{extensionID}.drawGeometry", False)
 
         color_key = "glyphViewEchoStrokeColor"
@@ -252,6 +295,8 @@ class CurveEqualizer(BaseCurveEqualizer, WindowController):
 
     @dglyph.setter
     def dglyph(self, value: RGlyph | None) -> None:
+        # The selection may have changed, the sweep must be recomputed
+        self.sweep = None
         if value is None:
             self._dglyph = None
             self.tmp_glyph = None
@@ -499,57 +544,230 @@ class CurveEqualizer(BaseCurveEqualizer, WindowController):
                             print("ERROR: Don't know how to draw this segment:")
                             for point in segment.points:
                                 print(f"    {point}")
+                    elif ref_contour[si].selected and segment.type == "qcurve":
+                        p0 = contour[si - 1][-1]
+                        if self.previewCurves:
+                            appendQCurveSegment(
+                                curveLayer,
+                                p0,
+                                segment.points,
+                                self.stroke_color,
+                                self.stroke_width,
+                            )
+                        if self.previewHandles:
+                            for pt in segment.points[:-1]:
+                                appendHandle(
+                                    self.container,
+                                    pt,
+                                    1,
+                                    color=self.stroke_color,
+                                    width=self.stroke_width,
+                                )
+                                appendHandle(
+                                    self.container,
+                                    pt,
+                                    -1,
+                                    color=self.stroke_color,
+                                    width=self.stroke_width,
+                                )
         if self.drawGeometry:
             self._drawGeometry()
 
     # The main method, check which EQ should be applied and do it (or just
     # apply it on the preview glyph)
 
+    def _getSweep(self) -> ParameterSweep:
+        # Compute the handles of all selected segments for the whole
+        # parameter range of the current method
+        if self.sweep is not None and self.sweep.method == self.method:
+            return self.sweep
+
+        if self.method == "adjust":
+            parameter = "curvature"
+            values = list(self.curvatures.values())
+        else:
+            parameter = "tension" if self.method == "hobby" else "curvature"
+            values = getSweepValues(0.5, 1.0, self.sweepResolution)
+
+        self.sweep_keys = []
+        segments = []
+        for contourIndex, reference_contour in enumerate(self.dglyph):
+            for i, reference_segment in enumerate(reference_contour):
+                if reference_segment.selected and reference_segment.type == "curve":
+                    if len(reference_segment.points) == 3:
+                        p0 = reference_contour[i - 1][-1]
+                        segments.append(
+                            tuple((p.x, p.y) for p in (p0, *reference_segment.points))
+                        )
+                        self.sweep_keys.append((contourIndex, i))
+        self.sweep = ParameterSweep(segments, self.method, parameter, values)
+        return self.sweep
+
+    def _eqSelectedFromSweep(self) -> None:
+        # Preview only, look up the handles from the precomputed sweep
+        sweep = self._getSweep()
+        if self.method == "adjust":
+            value = self.curvature
+        elif self.method == "free":
+            value = self.curvatureFree
+        else:
+            value = self.tension
+        for (contourIndex, i), (x1, y1, x2, y2) in zip(
+            self.sweep_keys, sweep.lookup(value)
+        ):
+            p1, p2, _ = self.tmp_glyph[contourIndex][i].points
+            p1.x = x1
+            p1.y = y1
+            p2.x = x2
+            p2.y = y2
+
+    def _eqSegment(self, p0, p1, p2, p3):
+        # Apply the current method to a cubic segment
+        if self.method == "fl":
+            p1, p2 = eqPercentage(p0, p1, p2, p3)
+        elif self.method == "thirds":
+            p1, p2 = eqThirds(p0, p1, p2, p3)
+        elif self.method == "balance":
+            p1, p2 = eqBalance(p0, p1, p2, p3)
+        elif self.method == "adjust":
+            p1, p2 = eqPercentage(p0, p1, p2, p3, self.curvature)
+        elif self.method == "free":
+            p1, p2 = eqPercentage(p0, p1, p2, p3, self.curvatureFree)
+        elif self.method == "hobby":
+            p1, p2 = eqSpline(p0, p1, p2, p3, self.tension)
+        elif self.method == "quadratic":
+            p1, p2 = eqQuadratic(p0, p1, p2, p3, self.quadraticTolerance)
+        elif self.method == "arc":
+            p1, p2 = eqArc(p0, p1, p2, p3)
+        elif self.method == "area":
+            p1, p2 = eqArea(p0, p1, p2, p3)
+        elif self.method == "arclength":
+            p1, p2 = eqArcLength(p0, p1, p2, p3)
+        elif self.method == "auto":
+            winner, (p1.x, p1.y, p2.x, p2.y) = chooseMethod(
+                p0, p1, p2, p3, self.autoObjective, self.tension
+            )
+            self.autoWinner = winner
+        else:
+            logger.error(f"Unknown equalize method: {self.method}")
+        return p1, p2
+
+    def _eqSelectedG2(self, reference_glyph, modify_glyph, doRound: bool) -> None:
+        # The G2 method works on chains of selected curve segments
+        for contourIndex, reference_contour in enumerate(reference_glyph):
+            modify_contour = modify_glyph[contourIndex]
+            segments = []
+            for i, reference_segment in enumerate(reference_contour):
+                modify_segment = modify_contour[i]
+                if (
+                    reference_segment.selected
+                    and reference_segment.type == "curve"
+                    and len(modify_segment.points) == 3
+                ):
+                    segments.append((modify_contour[i - 1][-1], *modify_segment.points))
+                else:
+                    segments.append(None)
+            for chain, cyclic in getChains(segments, not reference_contour.open):
+                eqG2(
+                    [segments[i] for i in chain],
+                    [segments[i][3].smooth for i in chain],
+                    cyclic,
+                )
+                if doRound:
+                    for i in chain:
+                        segments[i][1].round()
+                        segments[i][2].round()
+
     def _eqSelected(self, sender=None) -> None:
         reference_glyph = self.dglyph
         reference_glyph_selected_points = reference_glyph.selectedPoints
 
         if reference_glyph_selected_points != []:
+            # Cubic curves in the preview are looked up from the sweep,
+            # quadratic curves are always calculated
+            use_sweep = sender is None and self.method in ("adjust", "free", "hobby")
+            if use_sweep:
+                self._eqSelectedFromSweep()
+
             if sender is None:
                 # EQ button not pressed, preview only.
                 modify_glyph = self.tmp_glyph
             else:
-                modify_glyph = reference_glyph
-                reference_glyph.prepareUndo(
-                    undoTitle="Equalize curve in /%s" % reference_glyph.name
-                )
-            for contourIndex, reference_contour in enumerate(reference_glyph):
-                modify_contour = modify_glyph[contourIndex]
-                for i, reference_segment in enumerate(reference_contour):
-                    modify_segment = modify_contour[i]
-                    if reference_segment.selected and reference_segment.type == "curve":
+                # Equalize a copy, so only the points that move are written
+                # back to the glyph
+                modify_glyph = reference_glyph.copy()
+            if self.method == "g2":
+                self._eqSelectedG2(reference_glyph, modify_glyph, sender is not None)
+            else:
+                for contourIndex, reference_contour in enumerate(reference_glyph):
+                    modify_contour = modify_glyph[contourIndex]
+                    for i, reference_segment in enumerate(reference_contour):
+                        modify_segment = modify_contour[i]
+                        if not reference_segment.selected:
+                            continue
+
                         # last point of the previous segment
                         p0 = modify_contour[i - 1][-1]
-                        if len(modify_segment.points) == 3:
-                            p1, p2, p3 = modify_segment.points
-
-                            if self.method == "fl":
-                                p1, p2 = eqPercentage(p0, p1, p2, p3)
-                            elif self.method == "thirds":
-                                p1, p2 = eqThirds(p0, p1, p2, p3)
-                            elif self.method == "balance":
-                                p1, p2 = eqBalance(p0, p1, p2, p3)
-                            elif self.method == "adjust":
-                                p1, p2 = eqPercentage(p0, p1, p2, p3, self.curvature)
-                            elif self.method == "free":
-                                p1, p2 = eqPercentage(
-                                    p0, p1, p2, p3, self.curvatureFree
-                                )
-                            elif self.method == "hobby":
-                                p1, p2 = eqSpline(p0, p1, p2, p3, self.tension)
-                            else:
-                                logger.error("Unknown equalize method: {self.method}")
+                        if reference_segment.type == "curve" and not use_sweep:
+                            if len(modify_segment.points) == 3:
+                                p1, p2, p3 = modify_segment.points
+                                p1, p2 = self._eqSegment(p0, p1, p2, p3)
+                                if sender is not None:
+                                    p1.round()
+                                    p2.round()
+                                    if self.method == "auto":
+                                        print(
+                                            f"/{reference_glyph.name} contour "
+                                            f"{contourIndex} segment {i}: "
+                                            f"{self.autoWinner}"
+                                        )
+                        elif reference_segment.type == "qcurve":
+                            *offCurves, p3 = modify_segment.points
+                            offCurves = eqQCurve(p0, offCurves, p3, self._eqSegment)
                             if sender is not None:
-                                p1.round()
-                                p2.round()
+                                for p in offCurves:
+                                    p.round()
             if sender is not None:
-                reference_glyph.changed()
-                reference_glyph.performUndo()
+                self._writeChanges(reference_glyph, modify_glyph)
+
+    def _writeChanges(self, reference_glyph, modify_glyph) -> None:
+        # Move the points that differ in the equalized copy. The undo step
+        # and the change notification are skipped if nothing moves and
+        # nothing can be merged.
+        moved = []
+        for reference_contour, modify_contour in zip(reference_glyph, modify_glyph):
+            for reference_point, modify_point in zip(
+                reference_contour.points, modify_contour.points
+            ):
+                x, y = modify_point.x, modify_point.y
+                if (reference_point.x, reference_point.y) != (x, y):
+                    moved.append((reference_point, x, y))
+                # The copy has no selection, which the merge needs
+                modify_point.selected = reference_point.selected
+        removed = 0
+        if self.mergeTolerance:
+            # Merge in the copy first, so no undo step is opened if nothing
+            # moves and nothing is merged
+            removed = mergeGlyphSegments(
+                modify_glyph, self.mergeTolerance, selectedOnly=True
+            )
+        if not moved and not removed:
+            return
+
+        reference_glyph.prepareUndo(
+            undoTitle="Equalize curve in /%s" % reference_glyph.name
+        )
+        for reference_point, x, y in moved:
+            reference_point.x = x
+            reference_point.y = y
+        if removed:
+            mergeGlyphSegments(reference_glyph, self.mergeTolerance, selectedOnly=True)
+            print(
+                f"/{reference_glyph.name}: removed {removed} points "
+                "by merging segments"
+            )
+        reference_glyph.changed()
+        reference_glyph.performUndo()
 
 
 if __name__ == "__main__":
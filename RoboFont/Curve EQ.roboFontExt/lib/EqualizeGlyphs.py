@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+from baseCurveEqualizer import BaseCurveEqualizer
+from EQExtensionID import extensionID
+from EQMethods.batch import Handles, Segment, equalizeSegments, methodFunctions
+from EQMethods.headless import getCurveSegments
+from fontTools.misc.roundTools import otRound
+from mojo.extensions import getExtensionDefault, setExtensionDefault
+from mojo.roboFont import CurrentFont
+from PyObjCTools.AppHelper import callAfter
+from vanilla import Button, CheckBox, FloatingWindow, PopUpButton, ProgressBar, TextBox
+
+if TYPE_CHECKING:
+    from lib.fontObjects.fontPartsWrappers import RFont, RGlyph
+
+"""
+Equalize the glyphs selected in the font overview
+
+The curve segments of the selected glyphs are copied as coordinates on the
+main thread. The handles are calculated in a thread pool, so the window
+stays responsive and the run can be cancelled. The results are written back
+on the main thread, one undo step per glyph, with the glyph notifications
+held until all its points have moved.
+
+The method parameters are the ones last saved by the Curve EQ palette. The
+G2 method works on whole contours and is not offered here.
+"""
+
+Snapshot = List[Tuple[int, int, Segment]]
+
+
+def getMethodParameters(method: str) -> Dict[str, Any]:
+    # Parameters as saved by the Curve EQ palette
+    if method == "adjust":
+        index = getExtensionDefault(f"{extensionID}.curvature", 0)
+        return {"curvature": BaseCurveEqualizer.curvatures[index]}
+
+    if method == "free":
+        return {"curvature": getExtensionDefault(f"{extensionID}.curvatureFree", 0.75)}
+
+    if method == "hobby":
+        return {"tension": getExtensionDefault(f"{extensionID}.tension", 0.75)}
+
+    if method == "quadratic":
+        return {
+            "tolerance": getExtensionDefault(f"{extensionID}.quadraticTolerance", 0.0)
+        }
+
+    if method == "auto":
+        return {
+            "objective": getExtensionDefault(f"{extensionID}.autoObjective", None),
+            "tension": getExtensionDefault(f"{extensionID}.tension", 0.75),
+        }
+
+    return {}
+
+
+def applyHandles(glyph: RGlyph, snapshot: Snapshot, results: List[Handles]) -> bool:
+    # Move the handles of one glyph as one undo step. Return True if any
+    # point has moved.
+    moves = []
+    for (contourIndex, i, _), (x1, y1, x2, y2) in zip(snapshot, results):
+        p1, p2, _ = glyph[contourIndex][i].points
+        moves.append((p1, otRound(x1), otRound(y1)))
+        moves.append((p2, otRound(x2), otRound(y2)))
+    moves = [(p, x, y) for p, x, y in moves if (p.x, p.y) != (x, y)]
+    if not moves:
+        return False
+
+    glyph.prepareUndo(undoTitle="Equalize curves in /%s" % glyph.name)
+    naked = glyph.naked()
+    naked.holdNotifications(note="Curve EQ")
+    for p, x, y in moves:
+        p.x = x
+        p.y = y
+    glyph.changed()
+    naked.releaseHeldNotifications()
+    glyph.performUndo()
+    return True
+
+
+class GlyphEqualizer:
+    def __init__(self) -> None:
+        self.methods = [
+            (key, name)
+            for key, name in zip(
+                BaseCurveEqualizer.methods.values(), BaseCurveEqualizer.methodNames
+            )
+            if key in methodFunctions
+        ]
+        self.font: RFont | None = None
+        self.executor: ThreadPoolExecutor | None = None
+        self.pending: Dict[str, Snapshot] = {}
+        # Results of a cancelled run may arrive during the next run
+        self.run = 0
+
+        self.w = FloatingWindow((250, 124), "Equalize Glyphs")
+        self.w.methodSelector = PopUpButton(
+            (8, 8, -8, 20),
+            [name.rstrip(":") for _, name in self.methods],
+            sizeStyle="small",
+        )
+        method = BaseCurveEqualizer.methods.get(
+            getExtensionDefault(f"{extensionID}.method", 0)
+        )
+        keys = [key for key, _ in self.methods]
+        if method in keys:
+            self.w.methodSelector.set(keys.index(method))
+        self.w.selectedOnly = CheckBox(
+            (8, 34, -8, 20),
+            "Selected segments only",
+            value=getExtensionDefault(f"{extensionID}.selectedSegmentsOnly", False),
+            sizeStyle="small",
+        )
+        self.w.progress = ProgressBar((8, 60, -8, 16), sizeStyle="small")
+        self.w.status = TextBox((8, 78, -8, 14), "", sizeStyle="mini")
+        self.w.startButton = Button(
+            (8, -32, -8, 25),
+            "Equalize Glyphs",
+            callback=self._start,
+            sizeStyle="small",
+        )
+        self.w.bind("close", self._windowWillClose)
+        self.w.open()
+
+    def _start(self, sender) -> None:
+        if self.executor is not None:
+            self._cancel()
+            return
+
+        font = CurrentFont()
+        if font is None:
+            self.w.status.set("No font is open.")
+            return
+
+        glyphNames = font.selectedGlyphNames
+        if not glyphNames:
+            self.w.status.set("No glyphs are selected.")
+            return
+
+        method = self.methods[self.w.methodSelector.get()][0]
+        params = getMethodParameters(method)
+        self.selectedOnly = bool(self.w.selectedOnly.get())
+
+        # Snapshot the segments on the main thread
+        self.font = font
+        self.pending = {}
+        for name in glyphNames:
+            snapshot = getCurveSegments(font[name], self.selectedOnly)
+            if snapshot:
+                self.pending[name] = snapshot
+        self.total = len(self.pending)
+        self.changedGlyphs = []
+        self.staleGlyphs = []
+        if not self.pending:
+            self.w.status.set("The selected glyphs have no curves.")
+            return
+
+        self.w.progress.set(0)
+        self.w.startButton.setTitle("Cancel")
+        self.run += 1
+        self.executor = ThreadPoolExecutor()
+        for name, snapshot in self.pending.items():
+            future = self.executor.submit(
+                equalizeSegments, [s for _, _, s in snapshot], method, **params
+            )
+            future.add_done_callback(
+                lambda f, name=name, run=self.run: callAfter(
+                    self._glyphDone, run, name, f
+                )
+            )
+
+    def _glyphDone(self, run: int, name: str, future: Future) -> None:
+        # Called on the main thread for each finished glyph
+        if run != self.run or future.cancelled():
+            return
+
+        snapshot = self.pending.pop(name, None)
+        if snapshot is None:
+            return
+
+        glyph = self.font[name] if name in self.font else None
+        if glyph is None or getCurveSegments(glyph, self.selectedOnly) != snapshot:
+            # The glyph was edited while its handles were calculated
+            self.staleGlyphs.append(name)
+        elif applyHandles(glyph, snapshot, future.result()):
+            self.changedGlyphs.append(name)
+
+        done = self.total - len(self.pending)
+        self.w.progress.set(100 * done / self.total)
+        self.w.status.set(f"{done} of {self.total} glyphs")
+        if not self.pending:
+            self._finish()
+
+    def _cancel(self) -> None:
+        self.pending = {}
+        self._finish()
+
+    def _finish(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        self.w.startButton.setTitle("Equalize Glyphs")
+        status = f"Changed {len(self.changedGlyphs)} of {self.total} glyphs"
+        if self.staleGlyphs:
+            status += f", skipped {len(self.staleGlyphs)} edited"
+        self.w.status.set(status + ".")
+        if self.staleGlyphs:
+            print(
+                "Skipped glyphs that were edited during the run:",
+                " ".join(f"/{name}" for name in self.staleGlyphs),
+            )
+
+    def _windowWillClose(self, sender) -> None:
+        if self.executor is not None:
+            self._cancel()
+        setExtensionDefault(
+            f"{extensionID}.selectedSegmentsOnly", bool(self.w.selectedOnly.get())
+        )
+
+
+if __name__ == "__main__":
+    GlyphEqualizer()